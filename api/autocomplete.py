@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import os
+import re
+import unicodedata
+from bisect import bisect_left, insort
+
+import anyio
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+TITLE_INDEX_REFRESH_SECONDS = int(os.getenv("TITLE_INDEX_REFRESH_SECONDS", 300))
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_title(title: str):
+    return WHITESPACE.sub(" ", unicodedata.normalize("NFKC", title).casefold()).strip()
+
+def _build(rows):
+    titles = {game_id: title for game_id, title in rows}
+    entries = sorted((normalize_title(title), game_id) for game_id, title in titles.items())
+    return titles, entries
+
+
+class TitleIndex:
+    """Sorted array of ``(normalized title, id)`` of every game of this worker.
+
+    Lookups are a binary search and never reach the database. Writes of this
+    worker are applied as they commit, and ``run`` reloads the whole index
+    every ``refresh_interval`` seconds in the background to pick up writes
+    made by other workers.
+    """
+
+    def __init__(self, refresh_interval: int):
+        self.refresh_interval = refresh_interval
+        self._entries = []
+        self._titles = {}
+        # Writes made while a reload is in flight, replayed on the new snapshot.
+        self._pending = None
+
+    def add(self, game_id: int, title: str):
+        if self._pending is not None:
+            self._pending.append((game_id, title))
+        self._add(game_id, title)
+
+    def remove(self, game_id: int):
+        if self._pending is not None:
+            self._pending.append((game_id, None))
+        self._remove(game_id)
+
+    def complete(self, prefix: str, limit: int):
+        """Games whose normalized title starts with ``prefix``, in title order."""
+        prefix = normalize_title(prefix)
+        matches = []
+        index = bisect_left(self._entries, (prefix,))
+        while len(matches) < limit and index < len(self._entries):
+            key, game_id = self._entries[index]
+            if not key.startswith(prefix):
+                break
+            matches.append({"id": game_id, "title": self._titles[game_id]})
+            index += 1
+        return matches
+
+    async def refresh(self, fetch):
+        """Reload the index from the ``(id, title)`` rows of ``await fetch()``.
+
+        Does nothing while another reload is running. Normalizing and sorting
+        happen in a worker thread.
+        """
+        if self._pending is not None:
+            return
+        self._pending = []
+        try:
+            titles, entries = await anyio.to_thread.run_sync(_build, await fetch())
+            pending = self._pending or []
+            self._titles, self._entries = titles, entries
+        finally:
+            self._pending = None
+        for game_id, title in pending:
+            if title is None:
+                self._remove(game_id)
+            else:
+                self._add(game_id, title)
+
+    async def run(self, fetch):
+        """Call ``refresh`` every ``refresh_interval`` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh(fetch)
+            except Exception:
+                logger.exception("Reloading the title index failed")
+
+    def clear(self):
+        self._entries = []
+        self._titles = {}
+        self._pending = None
+
+    def stats(self):
+        return {"titles": len(self._entries), "refresh_interval": self.refresh_interval}
+
+    def _add(self, game_id: int, title: str):
+        self._remove(game_id)
+        insort(self._entries, (normalize_title(title), game_id))
+        self._titles[game_id] = title
+
+    def _remove(self, game_id: int):
+        title = self._titles.pop(game_id, None)
+        if title is None:
+            return
+        index = bisect_left(self._entries, (normalize_title(title), game_id))
+        del self._entries[index]
+
+
+title_index = TitleIndex(refresh_interval=TITLE_INDEX_REFRESH_SECONDS)
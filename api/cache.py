@@ -0,0 +1,205 @@
+import os
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+REVOCATION_REFRESH_SECONDS = int(os.getenv("REVOCATION_REFRESH_SECONDS", 30))
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", 10000))
+ENTITY_CACHE_MAX_BYTES = int(os.getenv("ENTITY_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+
+
+class PrincipalCache:
+    """LRU cache of verified principals keyed by the raw bearer token.
+
+    An entry never outlives the ``exp`` claim of its token, and entries of a
+    user can be dropped at once when the user changes.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._tokens_by_user = {}
+
+    def get(self, token: str):
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, principal = entry
+        if expires_at <= time.time():
+            self._discard(token)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return principal
+
+    def set(self, token: str, principal, exp: float):
+        if self.maxsize <= 0:
+            return
+        self._discard(token)
+        self._entries[token] = (min(exp, time.time() + self.ttl), principal)
+        self._tokens_by_user.setdefault(principal.id, set()).add(token)
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+
+    def invalidate_user(self, user_id: int):
+        for token in self._tokens_by_user.pop(user_id, ()):
+            self._entries.pop(token, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._tokens_by_user.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _discard(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry[1].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry[1].id]
+
+
+class RevokedTokenVersions:
+    """Lowest still valid token version of every user who revoked tokens.
+
+    Only users with a non-zero ``token_version`` are kept, so the mapping
+    stays small. It is reloaded from the database every ``refresh_interval``
+    seconds to pick up revocations made by other workers.
+    """
+
+    def __init__(self, refresh_interval: int):
+        self.refresh_interval = refresh_interval
+        self._valid_from = {}
+        self._loaded_at = None
+
+    def is_revoked(self, user_id: int, version: int):
+        return version < self._valid_from.get(user_id, 0)
+
+    def revoke(self, user_id: int, valid_from: int):
+        if valid_from > self._valid_from.get(user_id, 0):
+            self._valid_from[user_id] = valid_from
+
+    def is_stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_interval
+
+    def load(self, rows):
+        self._valid_from = {user_id: version for user_id, version in rows}
+        self._loaded_at = time.monotonic()
+
+    def clear(self):
+        self._valid_from = {}
+        self._loaded_at = None
+
+    def stats(self):
+        return {
+            "users": len(self._valid_from),
+            "refresh_interval": self.refresh_interval,
+        }
+
+
+class EntityCache:
+    """LRU cache of serialized records keyed by id, bounded by count and bytes.
+
+    Every record is stored together with the row version it was serialized
+    from and is only returned for that version, so an entry outdated by
+    another worker is never served. Records can be tagged, e.g. a game with
+    its genre ids, to drop all entries that embed a changed row at once.
+    """
+
+    def __init__(self, maxsize: int, max_bytes: int):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._ids_by_tag = {}
+
+    def get(self, entity_id: int, version: int):
+        entry = self._entries.get(entity_id)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(entity_id)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, entity_id: int, version: int, record: bytes, tags=()):
+        self._discard(entity_id)
+        if self.maxsize <= 0 or len(record) > self.max_bytes:
+            return
+        tags = frozenset(tags)
+        self._entries[entity_id] = (version, record, tags)
+        self.bytes += len(record)
+        for tag in tags:
+            self._ids_by_tag.setdefault(tag, set()).add(entity_id)
+        while len(self._entries) > self.maxsize or self.bytes > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+
+    def invalidate(self, *entity_ids: int):
+        for entity_id in entity_ids:
+            self._discard(entity_id)
+
+    def invalidate_tag(self, tag):
+        for entity_id in list(self._ids_by_tag.get(tag, ())):
+            self._discard(entity_id)
+
+    def clear(self):
+        self._entries.clear()
+        self._ids_by_tag.clear()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _discard(self, entity_id: int):
+        entry = self._entries.pop(entity_id, None)
+        if entry is None:
+            return
+        self.bytes -= len(entry[1])
+        for tag in entry[2]:
+            ids = self._ids_by_tag.get(tag)
+            if ids is not None:
+                ids.discard(entity_id)
+                if not ids:
+                    del self._ids_by_tag[tag]
+
+
+principal_cache = PrincipalCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+revoked_token_versions = RevokedTokenVersions(refresh_interval=REVOCATION_REFRESH_SECONDS)
+game_cache = EntityCache(maxsize=ENTITY_CACHE_SIZE, max_bytes=ENTITY_CACHE_MAX_BYTES)
+genre_cache = EntityCache(maxsize=ENTITY_CACHE_SIZE, max_bytes=ENTITY_CACHE_MAX_BYTES)
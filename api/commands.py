@@ -0,0 +1,24 @@
+import argparse
+import asyncio
+
+from api.crud import rebuild_facets
+from api.database import async_session
+
+
+async def _rebuild_facets():
+    async with async_session() as db:
+        count = await rebuild_facets(db=db)
+    print(f"Rebuilt {count} game facets")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m api.commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild-facets", help="recompute game_facets from the catalog")
+    args = parser.parse_args(argv)
+    if args.command == "rebuild-facets":
+        asyncio.run(_rebuild_facets())
+
+
+if __name__ == "__main__":
+    main()
@@ -2,4 +2,7 @@ from .users import *
 from .backlogs import *
 from .complete_games import *
 from .genres import *
-from .games import *
\ No newline at end of file
+from .games import *
+from .facets import *
+from .login_buckets import *
+from .versions import *
\ No newline at end of file
@@ -1,8 +1,16 @@
-from sqlalchemy import select, delete
+from sqlalchemy import Integer, String, select, delete, update, func, literal, tuple_, any_
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.models import Backlog, Game, backlog_game
+from api.cache import principal_cache
+from api.crud.users import profile_touch, touch_profiles
+from api.crud.versions import bump_version, touch_backlogs
+from api.exceptions import NotFoundError, NotInListError
+from api.ranks import RANK_MAX_LENGTH, rank_after, rank_before, rank_between, ranks_after, spread_ranks
+from api.models import Backlog, CompleteGame, Game, backlog_game, completegame_game
+from api.filters import GameFilters, BacklogGameSort
+from api.pagination import Page
 
 
 async def create_backlog(db: AsyncSession, user_id: int):
@@ -11,7 +19,9 @@ async def create_backlog(db: AsyncSession, user_id: int):
         games=[]
     )
     db.add(new_backlog)
+    await touch_profiles(db, [user_id])
     await db.commit()
+    principal_cache.invalidate_user(user_id)
     return new_backlog
 
 async def get_backlog(db: AsyncSession, backlog_id: int):
@@ -22,33 +32,187 @@ async def get_backlog(db: AsyncSession, backlog_id: int):
     )
     return result.scalars().first()
 
-async def get_backlogs(db: AsyncSession, skip: int = 0, limit: int = 0):
+async def get_backlogs(db: AsyncSession, page: Page = Page()):
     result = await db.execute(
-        select(Backlog)
-        .order_by(Backlog.id)
-        .offset(skip)
-        .limit(limit)
+        page.apply(select(Backlog), Backlog.id)
         .options(selectinload(Backlog.games).selectinload(Game.genres))
     )
-    return result.scalars().fetchall()
+    return page.slice(result.scalars().fetchall(), key=lambda backlog: [backlog.id])
+
+async def get_backlog_header(db: AsyncSession, backlog_id: int):
+    """A backlog without its games, only how many there are."""
+    game_count = (
+        select(func.count())
+        .where(backlog_game.c.backlog_id==Backlog.id)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(Backlog.id, Backlog.user_id, game_count.label("game_count"))
+        .where(Backlog.id==backlog_id)
+    )
+    return result.first()
+
+async def get_backlog_games(db: AsyncSession, backlog_id: int, page: Page = Page(), filters: GameFilters = GameFilters(), sort: BacklogGameSort = BacklogGameSort()):
+    """One page of the games of a backlog, by rank unless ``sort`` says otherwise."""
+    query = (
+        select(Game, backlog_game.c.position)
+        .join(backlog_game, backlog_game.c.game_id==Game.id)
+        .where(backlog_game.c.backlog_id==backlog_id)
+    )
+    result = await db.execute(
+        page.apply(filters.apply(query), *sort.columns, descending=sort.descending, anchor=sort.anchor(backlog_id))
+        .options(selectinload(Game.genres))
+    )
+    rows, next_cursor = page.slice(result.fetchall(), key=sort.key)
+    return [row.Game for row in rows], next_cursor
 
 async def delete_backlog(db: AsyncSession, backlog_id: int):
-    await db.execute(
+    result = await db.execute(
         delete(Backlog)
         .where(Backlog.id==backlog_id)
+        .returning(Backlog.user_id)
     )
+    user_ids = result.scalars().all()
+    await touch_profiles(db, user_ids)
     await db.commit()
+    for user_id in user_ids:
+        principal_cache.invalidate_user(user_id)
     return True
 
+async def _lock_backlog(db: AsyncSession, backlog_id: int):
+    """Lock a backlog against concurrent rank writes and return its owner id."""
+    result = await db.execute(
+        select(Backlog.user_id)
+        .where(Backlog.id==backlog_id)
+        .with_for_update()
+    )
+    return result.scalar()
+
+async def _last_position(db: AsyncSession, backlog_id: int):
+    result = await db.execute(
+        select(func.max(backlog_game.c.position))
+        .where(backlog_game.c.backlog_id==backlog_id)
+    )
+    return result.scalar()
+
+async def _reload_backlog(db: AsyncSession, backlog: Backlog):
+    db.expire(backlog, ["games"])
+    return await get_backlog(db=db, backlog_id=backlog.id)
+
 async def update_backlog(db: AsyncSession, backlog: Backlog, game: Game):
-    backlog.games.append(game)
+    """Append a game to the end of a backlog."""
+    await _lock_backlog(db, backlog.id)
+    await db.execute(
+        insert(backlog_game)
+        .values(backlog_id=backlog.id, game_id=game.id, position=rank_after(await _last_position(db, backlog.id)))
+    )
+    await touch_profiles(db, [backlog.user_id])
+    await touch_backlogs(db, [backlog.id])
     await db.commit()
-    return backlog
+    return await _reload_backlog(db, backlog)
 
 async def clear_backlog(db: AsyncSession, backlog: Backlog, game: Game):
-    backlog.games.remove(game)
+    await db.execute(
+        delete(backlog_game)
+        .where(backlog_game.c.backlog_id==backlog.id)
+        .where(backlog_game.c.game_id==game.id)
+    )
+    await touch_profiles(db, [backlog.user_id])
+    await touch_backlogs(db, [backlog.id])
+    await db.commit()
+    return await _reload_backlog(db, backlog)
+
+async def move_backlog_game(db: AsyncSession, backlog_id: int, game_id: int, after_game_id: int | None):
+    """Put a game right after ``after_game_id``, or first when it is None.
+
+    Only the moved row is written. Raises NotFoundError for a missing
+    backlog and NotInListError when either game is not in it.
+    """
+    user_id = await _lock_backlog(db, backlog_id)
+    if user_id is None:
+        raise NotFoundError("Backlog not Found")
+    result = await db.execute(
+        select(backlog_game.c.game_id, backlog_game.c.position)
+        .where(backlog_game.c.backlog_id==backlog_id)
+        .where(backlog_game.c.game_id.in_([game_id] if after_game_id is None else [game_id, after_game_id]))
+    )
+    positions = dict(result.all())
+    if game_id not in positions:
+        raise NotInListError("This game is not in the backlog")
+    if after_game_id is not None and after_game_id not in positions:
+        raise NotInListError("The game to move after is not in the backlog")
+    if after_game_id == game_id:
+        return {"game_id": game_id, "position": positions[game_id]}
+    following = (
+        select(backlog_game.c.position)
+        .where(backlog_game.c.backlog_id==backlog_id)
+        .where(backlog_game.c.game_id!=game_id)
+        .order_by(backlog_game.c.position, backlog_game.c.game_id)
+        .limit(1)
+    )
+    before = None
+    if after_game_id is not None:
+        before = positions[after_game_id]
+        following = following.where(
+            tuple_(backlog_game.c.position, backlog_game.c.game_id) > tuple_(literal(before), literal(after_game_id))
+        )
+    after = (await db.execute(following)).scalar()
+    if before is not None and before == after:
+        await _rebalance_backlog(db, backlog_id)
+        return await move_backlog_game(db=db, backlog_id=backlog_id, game_id=game_id, after_game_id=after_game_id)
+    if before is None:
+        position = rank_before(after)
+    elif after is None:
+        position = rank_after(before)
+    else:
+        position = rank_between(before, after)
+    await db.execute(
+        update(backlog_game)
+        .where(backlog_game.c.backlog_id==backlog_id)
+        .where(backlog_game.c.game_id==game_id)
+        .values(position=position)
+    )
+    await touch_profiles(db, [user_id])
+    await touch_backlogs(db, [backlog_id])
     await db.commit()
-    return backlog
+    return {"game_id": game_id, "position": position}
+
+async def _rebalance_backlog(db: AsyncSession, backlog_id: int):
+    result = await db.execute(
+        select(backlog_game.c.game_id)
+        .where(backlog_game.c.backlog_id==backlog_id)
+        .order_by(backlog_game.c.position, backlog_game.c.game_id)
+    )
+    game_ids = result.scalars().all()
+    ranks = func.unnest(
+        literal(game_ids, ARRAY(Integer)),
+        literal(spread_ranks(len(game_ids)), ARRAY(String))
+    ).table_valued("game_id", "position").render_derived()
+    await db.execute(
+        update(backlog_game)
+        .where(backlog_game.c.backlog_id==backlog_id)
+        .where(backlog_game.c.game_id==ranks.c.game_id)
+        .values(position=ranks.c.position)
+    )
+
+async def rebalance_backlog(db: AsyncSession, backlog_id: int):
+    """Respread the ranks of a backlog once one is longer than RANK_MAX_LENGTH.
+
+    The order is kept, so the backlog version is not bumped. Meant to run
+    as a background task after writes that add ranks.
+    """
+    if await _lock_backlog(db, backlog_id) is None:
+        await db.commit()
+        return False
+    result = await db.execute(
+        select(func.max(func.length(backlog_game.c.position)))
+        .where(backlog_game.c.backlog_id==backlog_id)
+    )
+    rebalanced = (result.scalar() or 0) > RANK_MAX_LENGTH
+    if rebalanced:
+        await _rebalance_backlog(db, backlog_id)
+    await db.commit()
+    return rebalanced
 
 async def is_game_in_backlog(db: AsyncSession, game_id: int, backlog_id: int):
     result = await db.execute(
@@ -57,4 +221,108 @@ async def is_game_in_backlog(db: AsyncSession, game_id: int, backlog_id: int):
         .where(Game.id==game_id)
         .where(Backlog.id==backlog_id)
     )
-    return result.scalars().first()
\ No newline at end of file
+    return result.scalars().first()
+
+async def link_backlog_games(db: AsyncSession, backlog_id: int, game_ids: list[int]):
+    """Add ``game_ids`` to a backlog in one statement and return the ids that were new.
+
+    Raises NotFoundError for a missing backlog or unknown games.
+    """
+    user_id = await _lock_backlog(db, backlog_id)
+    if user_id is None:
+        raise NotFoundError("Backlog not Found")
+    game_ids = list(dict.fromkeys(game_ids))
+    if not game_ids:
+        return {"backlog_id": backlog_id, "added": [], "removed": []}
+    # Ids travel as one array parameter, however many there are.
+    result = await db.execute(
+        select(Game.id)
+        .where(Game.id==any_(literal(game_ids, ARRAY(Integer))))
+        .with_for_update(read=True)
+    )
+    missing = set(game_ids) - set(result.scalars())
+    if missing:
+        raise NotFoundError(f"Games not Found: {', '.join(str(game_id) for game_id in sorted(missing))}")
+    positions = ranks_after(await _last_position(db, backlog_id), len(game_ids))
+    rows = func.unnest(
+        literal(game_ids, ARRAY(Integer)),
+        literal(positions, ARRAY(String))
+    ).table_valued("game_id", "position").render_derived()
+    result = await db.execute(
+        insert(backlog_game)
+        .from_select(["backlog_id", "game_id", "position"], select(literal(backlog_id), rows.c.game_id, rows.c.position))
+        .on_conflict_do_nothing()
+        .returning(backlog_game.c.game_id)
+    )
+    added = sorted(result.scalars())
+    if added:
+        await touch_profiles(db, [user_id])
+        await touch_backlogs(db, [backlog_id])
+    await db.commit()
+    return {"backlog_id": backlog_id, "added": added, "removed": []}
+
+async def unlink_backlog_games(db: AsyncSession, backlog_id: int, game_ids: list[int]):
+    """Remove ``game_ids`` from a backlog in one statement and return the ids that were in it."""
+    user_id = await _lock_backlog(db, backlog_id)
+    if user_id is None:
+        raise NotFoundError("Backlog not Found")
+    result = await db.execute(
+        delete(backlog_game)
+        .where(backlog_game.c.backlog_id==backlog_id)
+        .where(backlog_game.c.game_id==any_(literal(game_ids, ARRAY(Integer))))
+        .returning(backlog_game.c.game_id)
+    )
+    removed = sorted(result.scalars())
+    if removed:
+        await touch_profiles(db, [user_id])
+        await touch_backlogs(db, [backlog_id])
+    await db.commit()
+    return {"backlog_id": backlog_id, "added": [], "removed": removed}
+
+async def complete_backlog_game(db: AsyncSession, backlog_id: int, complete_game_id: int, user_id: int, game_id: int):
+    """Move a game from a backlog to a completed list in one statement.
+
+    Returns whether the game was new to the completed list; raises
+    NotFoundError for a missing list and NotInListError when the game is
+    not in the backlog.
+    """
+    # The ids may come from a cached principal, so check both lists still exist.
+    if await _lock_backlog(db, backlog_id) is None:
+        raise NotFoundError("Backlog not Found")
+    result = await db.execute(
+        select(CompleteGame.id)
+        .where(CompleteGame.id==complete_game_id)
+        .with_for_update()
+    )
+    if result.scalar() is None:
+        raise NotFoundError("CompleteGame not Found")
+    backlogs = Backlog.__table__
+    complete_games = CompleteGame.__table__
+    moved = (
+        delete(backlog_game)
+        .where(backlog_game.c.backlog_id==backlog_id)
+        .where(backlog_game.c.game_id==game_id)
+        .returning(backlog_game.c.game_id)
+        .cte("moved")
+    )
+    inserted = (
+        insert(completegame_game)
+        .from_select(["complete_game_id", "game_id"], select(literal(complete_game_id), moved.c.game_id))
+        .on_conflict_do_nothing()
+        .returning(completegame_game.c.game_id)
+        .cte("inserted")
+    )
+    touches = [
+        bump_version(Backlog).where(backlogs.c.id==backlog_id).where(select(moved.c.game_id).exists()).cte("touched_backlog"),
+        bump_version(CompleteGame).where(complete_games.c.id==complete_game_id).where(select(inserted.c.game_id).exists()).cte("touched_complete_game"),
+        profile_touch(select(literal(user_id)).where(select(moved.c.game_id).exists())).cte("touched"),
+    ]
+    result = await db.execute(
+        select(select(moved.c.game_id).scalar_subquery(), select(inserted.c.game_id).scalar_subquery())
+        .add_cte(*touches)
+    )
+    moved_id, inserted_id = result.one()
+    if moved_id is None:
+        raise NotInListError("This game is not in the backlog")
+    await db.commit()
+    return inserted_id is not None
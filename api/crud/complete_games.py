@@ -1,8 +1,15 @@
-from sqlalchemy import select, delete
+from sqlalchemy import Integer, select, delete, func, literal, any_
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.models import CompleteGame, Game
+from api.cache import principal_cache
+from api.crud.users import touch_profiles
+from api.crud.versions import touch_complete_games
+from api.exceptions import NotFoundError
+from api.models import CompleteGame, Game, completegame_game
+from api.filters import GameFilters, GameSort
+from api.pagination import Page
 
 
 async def create_complete_game(db: AsyncSession, user_id: int):
@@ -11,7 +18,9 @@ async def create_complete_game(db: AsyncSession, user_id: int):
         games=[]
     )
     db.add(complete_game)
+    await touch_profiles(db, [user_id])
     await db.commit()
+    principal_cache.invalidate_user(user_id)
     return complete_game
 
 async def get_complete_game(db: AsyncSession, complete_game_id: int):
@@ -22,31 +31,62 @@ async def get_complete_game(db: AsyncSession, complete_game_id: int):
     )
     return result.scalars().first()
 
-async def get_complete_games(db: AsyncSession, skip: int = 0, limit: int = 100):
+async def get_complete_games(db: AsyncSession, page: Page = Page()):
     result = await db.execute(
-        select(CompleteGame)
-        .order_by(CompleteGame.id)
-        .offset(skip)
-        .limit(limit)
+        page.apply(select(CompleteGame), CompleteGame.id)
         .options(selectinload(CompleteGame.games).selectinload(Game.genres))
     )
-    return result.scalars().fetchall()
+    return page.slice(result.scalars().fetchall(), key=lambda complete_game: [complete_game.id])
+
+async def get_complete_game_header(db: AsyncSession, complete_game_id: int):
+    """A completed list without its games, only how many there are."""
+    game_count = (
+        select(func.count())
+        .where(completegame_game.c.complete_game_id==CompleteGame.id)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(CompleteGame.id, CompleteGame.user_id, game_count.label("game_count"))
+        .where(CompleteGame.id==complete_game_id)
+    )
+    return result.first()
+
+async def get_complete_game_games(db: AsyncSession, complete_game_id: int, page: Page = Page(), filters: GameFilters = GameFilters(), sort: GameSort = GameSort()):
+    query = (
+        select(Game)
+        .join(completegame_game, completegame_game.c.game_id==Game.id)
+        .where(completegame_game.c.complete_game_id==complete_game_id)
+    )
+    result = await db.execute(
+        page.apply(filters.apply(query), *sort.columns, descending=sort.descending)
+        .options(selectinload(Game.genres))
+    )
+    return page.slice(result.scalars().fetchall(), key=sort.key)
 
 async def delete_complete_game(db: AsyncSession, complete_game_id: int):
-    await db.execute(
+    result = await db.execute(
         delete(CompleteGame)
         .where(CompleteGame.id==complete_game_id)
+        .returning(CompleteGame.user_id)
     )
+    user_ids = result.scalars().all()
+    await touch_profiles(db, user_ids)
     await db.commit()
+    for user_id in user_ids:
+        principal_cache.invalidate_user(user_id)
     return True
 
 async def update_complete_game(db: AsyncSession, complete_game: CompleteGame, game: Game):
     complete_game.games.append(game)
+    await touch_profiles(db, [complete_game.user_id])
+    await touch_complete_games(db, [complete_game.id])
     await db.commit()
     return complete_game
 
 async def clear_complete_game(db: AsyncSession, complete_game: CompleteGame, game: Game):
     complete_game.games.remove(game)
+    await touch_profiles(db, [complete_game.user_id])
+    await touch_complete_games(db, [complete_game.id])
     await db.commit()
     return complete_game
 
@@ -57,4 +97,66 @@ async def is_game_in_complete_game(db: AsyncSession, game_id: int, complete_game
         .where(Game.id==game_id)
         .where(CompleteGame.id==complete_game_id)
     )
-    return result.scalars().first()
\ No newline at end of file
+    return result.scalars().first()
+
+async def link_complete_game_games(db: AsyncSession, complete_game_id: int, game_ids: list[int]):
+    """Add ``game_ids`` to a completed list in one statement and return the ids that were new.
+
+    Raises NotFoundError for a missing completed list or unknown games.
+    """
+    result = await db.execute(
+        select(CompleteGame.user_id)
+        .where(CompleteGame.id==complete_game_id)
+        .with_for_update()
+    )
+    user_id = result.scalar()
+    if user_id is None:
+        raise NotFoundError("CompleteGame not Found")
+    game_ids = sorted(set(game_ids))
+    if not game_ids:
+        return {"complete_game_id": complete_game_id, "added": [], "removed": []}
+    # Ids travel as one array parameter, however many there are.
+    ids = literal(game_ids, ARRAY(Integer))
+    result = await db.execute(
+        select(Game.id)
+        .where(Game.id==any_(ids))
+        .with_for_update(read=True)
+    )
+    missing = set(game_ids) - set(result.scalars())
+    if missing:
+        raise NotFoundError(f"Games not Found: {', '.join(str(game_id) for game_id in sorted(missing))}")
+    result = await db.execute(
+        insert(completegame_game)
+        .from_select(["complete_game_id", "game_id"], select(literal(complete_game_id), func.unnest(ids)))
+        .on_conflict_do_nothing()
+        .returning(completegame_game.c.game_id)
+    )
+    added = sorted(result.scalars())
+    if added:
+        await touch_profiles(db, [user_id])
+        await touch_complete_games(db, [complete_game_id])
+    await db.commit()
+    return {"complete_game_id": complete_game_id, "added": added, "removed": []}
+
+async def unlink_complete_game_games(db: AsyncSession, complete_game_id: int, game_ids: list[int]):
+    """Remove ``game_ids`` from a completed list in one statement and return the ids that were in it."""
+    result = await db.execute(
+        select(CompleteGame.user_id)
+        .where(CompleteGame.id==complete_game_id)
+        .with_for_update()
+    )
+    user_id = result.scalar()
+    if user_id is None:
+        raise NotFoundError("CompleteGame not Found")
+    result = await db.execute(
+        delete(completegame_game)
+        .where(completegame_game.c.complete_game_id==complete_game_id)
+        .where(completegame_game.c.game_id==any_(literal(game_ids, ARRAY(Integer))))
+        .returning(completegame_game.c.game_id)
+    )
+    removed = sorted(result.scalars())
+    if removed:
+        await touch_profiles(db, [user_id])
+        await touch_complete_games(db, [complete_game_id])
+    await db.commit()
+    return {"complete_game_id": complete_game_id, "added": [], "removed": removed}
@@ -0,0 +1,97 @@
+from sqlalchemy import Integer, String, select, delete, union_all, func, cast, literal, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.models import Game, Genre, game_genre, game_facets
+
+
+def game_facet_rows(games, sign: int):
+    """``(kind, value, delta)`` rows for the release year and publisher of ``games``.
+
+    ``games`` is any selectable with ``date_release`` and ``publisher`` columns.
+    """
+    return [
+        select(literal("year").label("kind"), func.to_char(games.c.date_release, "YYYY").label("value"), literal(sign).label("delta")),
+        select(literal("publisher").label("kind"), games.c.publisher.label("value"), literal(sign).label("delta")),
+    ]
+
+def genre_facet_rows(genre_ids, sign: int):
+    """``(kind, value, delta)`` rows for a select of genre ids, one per link."""
+    genre_ids = genre_ids.subquery()
+    return select(literal("genre").label("kind"), cast(genre_ids.c[0], String).label("value"), literal(sign).label("delta"))
+
+def facet_upsert(*rows):
+    """INSERT .. ON CONFLICT adding up the deltas of ``rows`` per facet.
+
+    Facets whose deltas cancel out are not written. Rows are inserted in
+    key order, so concurrent writers lock the shared facets in the same
+    order instead of deadlocking. Like the version touches it can be used
+    as a data-modifying CTE.
+    """
+    deltas = union_all(*rows).subquery()
+    total = func.sum(deltas.c.delta)
+    statement = insert(game_facets).from_select(
+        ["kind", "value", "count"],
+        select(deltas.c.kind, deltas.c.value, cast(total, Integer))
+        .group_by(deltas.c.kind, deltas.c.value)
+        .having(total != 0)
+        .order_by(deltas.c.kind, deltas.c.value)
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[game_facets.c.kind, game_facets.c.value],
+        set_={"count": game_facets.c.count + statement.excluded.count}
+    )
+
+def _all_facet_rows(game_ids, sign: int):
+    games = Game.__table__
+    return [
+        *game_facet_rows(select(games.c.date_release, games.c.publisher).where(games.c.id.in_(game_ids)).subquery(), sign),
+        genre_facet_rows(select(game_genre.c.genre_id).where(game_genre.c.game_id.in_(game_ids)), sign),
+    ]
+
+async def count_game_facets(db: AsyncSession, game_ids, sign: int):
+    """Add (``sign=1``) or remove (``sign=-1``) whole games from the facet counts."""
+    await db.execute(facet_upsert(*_all_facet_rows(game_ids, sign)))
+
+async def count_genre_facets(db: AsyncSession, genre_ids: list[int], sign: int):
+    """Count game-genre links that are added (``sign=1``) or removed (``sign=-1``)."""
+    if genre_ids:
+        await db.execute(facet_upsert(*(genre_facet_rows(select(literal(genre_id)), sign) for genre_id in genre_ids)))
+
+async def drop_genre_facets(db: AsyncSession, genre_id: int):
+    await db.execute(
+        delete(game_facets)
+        .where(game_facets.c.kind=="genre")
+        .where(game_facets.c.value==str(genre_id))
+    )
+
+async def rebuild_facets(db: AsyncSession):
+    """Recompute the facet counts from the catalog and return how many there are.
+
+    The table is locked, so writers wait instead of counting into rows
+    that are being replaced.
+    """
+    await db.execute(text(f"LOCK TABLE {game_facets.name} IN EXCLUSIVE MODE"))
+    await db.execute(delete(game_facets))
+    await db.execute(facet_upsert(*_all_facet_rows(select(Game.__table__.c.id), 1)))
+    result = await db.execute(select(func.count()).select_from(game_facets))
+    await db.commit()
+    return result.scalar()
+
+async def get_facets(db: AsyncSession):
+    genres = Genre.__table__
+    result = await db.execute(
+        select(game_facets.c.kind, game_facets.c.value, game_facets.c.count, genres.c.title)
+        .outerjoin(genres, (game_facets.c.kind=="genre") & (cast(genres.c.id, String)==game_facets.c.value))
+        .where(game_facets.c.count > 0)
+        .order_by(game_facets.c.kind, game_facets.c.count.desc(), game_facets.c.value)
+    )
+    facets = {"genres": [], "years": [], "publishers": []}
+    for kind, value, count, title in result:
+        if kind == "genre":
+            facets["genres"].append({"id": int(value), "title": title, "count": count})
+        elif kind == "year":
+            facets["years"].append({"year": int(value), "count": count})
+        else:
+            facets["publishers"].append({"publisher": value, "count": count})
+    return facets
@@ -1,31 +1,164 @@
-from sqlalchemy import select, delete
+from sqlalchemy import JSON, Column, Date, Integer, MetaData, String, Table, select, delete, update, func, literal, or_, text, true, type_coerce
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by, insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.models import Genre, Game
-from api.schemas import GameCreate, GameUpdate
+from api.autocomplete import title_index
+from api.cache import game_cache
+from api.crud.facets import count_game_facets, count_genre_facets, facet_upsert, game_facet_rows, genre_facet_rows
+from api.crud.users import profile_touch, touch_profiles
+from api.crud.versions import container_touches, touch_games
+from api.exceptions import NotFoundError, NotOwnerError, ConflictError, is_unique_violation
+from api.models import Genre, Game, game_genre, game_search_vector
+from api.filters import GameFilters, GameSort
+from api.pagination import Page
+from api.schemas import GameCreate, GameUpdate, GameImportRow, Game as GameOut
+
+
+game_import = Table("game_import", MetaData(),
+                    Column("line", Integer),
+                    Column("title", String),
+                    Column("developer", String),
+                    Column("publisher", String),
+                    Column("date_release", Date),
+                    Column("image", String),
+                    Column("genre_ids", ARRAY(Integer)),
+                    prefixes=["TEMPORARY"])
 
 
 async def create_game(db: AsyncSession, game: GameCreate):
-    new_game = Game(
-        title=game.title,
-        developer=game.developer,
-        publisher=game.publisher,
-        date_release=game.date_release,
-        image=game.image,
-        user_id=game.user_id,
-        genres=[]
-    )
-    db.add(new_game)
-    await db.commit()
-    for genre in game.genres:
+    genre_ids = {genre.id for genre in game.genres}
+    genres = []
+    if genre_ids:
         result = await db.execute(
             select(Genre)
-            .where(Genre.id==genre.id)
+            .where(Genre.id.in_(genre_ids))
+            .with_for_update(read=True)
+        )
+        genres = result.scalars().all()
+        missing = genre_ids - {genre.id for genre in genres}
+        if missing:
+            raise NotFoundError(f"Genres not Found: {', '.join(str(genre_id) for genre_id in sorted(missing))}")
+    result = await db.execute(
+        insert(Game.__table__)
+        .values(
+            title=game.title,
+            developer=game.developer,
+            publisher=game.publisher,
+            date_release=game.date_release,
+            image=game.image,
+            user_id=game.user_id
+        )
+        .on_conflict_do_nothing(index_elements=["title"])
+        .returning(*Game.__mapper__.columns)
+    )
+    new_game = result.mappings().first()
+    if new_game is None:
+        raise ConflictError("There is already a Game with this title")
+    if genres:
+        await db.execute(
+            insert(game_genre)
+            .values([{"game_id": new_game["id"], "genre_id": genre.id} for genre in genres])
+        )
+    await count_game_facets(db, [new_game["id"]], 1)
+    await touch_profiles(db, [game.user_id])
+    await db.commit()
+    title_index.add(new_game["id"], new_game["title"])
+    return {**new_game, "genres": genres}
+
+async def import_games(db: AsyncSession, rows: list[tuple[int, GameImportRow]], user_id: int):
+    """Insert a chunk of validated rows through a COPY-loaded staging table.
+
+    Returns ``(inserted, rejected)``: the number of new games and a list of
+    ``(line, detail)`` for rows that were not imported.
+    """
+    await db.run_sync(lambda session: game_import.create(session.connection(), checkfirst=True))
+    await db.execute(game_import.delete())
+    connection = await (await db.connection()).get_raw_connection()
+    await connection.driver_connection.copy_records_to_table(
+        game_import.name,
+        records=[
+            (line, row.title, row.developer, row.publisher, row.date_release, row.image, sorted(set(row.genres)))
+            for line, row in rows
+        ],
+        columns=[column.name for column in game_import.c]
+    )
+    rejected = []
+
+    requested = func.unnest(game_import.c.genre_ids).table_valued("genre_id").render_derived()
+    result = await db.execute(
+        delete(game_import)
+        .where(
+            select(requested.c.genre_id)
+            .where(~select(Genre.id).where(Genre.id==requested.c.genre_id).exists())
+            .exists()
+        )
+        .returning(game_import.c.line)
+    )
+    rejected.extend((line, "Genres not Found") for line in result.scalars())
+
+    earlier = game_import.alias("earlier")
+    result = await db.execute(
+        delete(game_import)
+        .where(game_import.c.title==earlier.c.title)
+        .where(game_import.c.line > earlier.c.line)
+        .returning(game_import.c.line)
+    )
+    rejected.extend((line, "Duplicate title in the import") for line in result.scalars())
+
+    games = Game.__table__
+    inserted = (
+        insert(games)
+        .from_select(
+            ["title", "developer", "publisher", "date_release", "image", "user_id"],
+            select(
+                game_import.c.title,
+                game_import.c.developer,
+                game_import.c.publisher,
+                game_import.c.date_release,
+                game_import.c.image,
+                literal(user_id)
+            )
         )
-        new_game.genres.append(result.scalars().first())
+        .on_conflict_do_nothing(index_elements=["title"])
+        .returning(games.c.id, games.c.title, games.c.date_release, games.c.publisher)
+        .cte("inserted")
+    )
+    requested = func.unnest(game_import.c.genre_ids).table_valued("genre_id").render_derived()
+    inserted_links = (
+        select(inserted.c.id, requested.c.genre_id)
+        .join_from(inserted, game_import, game_import.c.title==inserted.c.title)
+        .join(requested, true())
+    )
+    links = (
+        insert(game_genre)
+        .from_select(["game_id", "genre_id"], inserted_links)
+        .cte("links")
+    )
+    facets = facet_upsert(
+        *game_facet_rows(inserted, 1),
+        genre_facet_rows(inserted_links.with_only_columns(requested.c.genre_id), 1)
+    ).cte("facets")
+    result = await db.execute(
+        select(game_import.c.line)
+        .where(game_import.c.title.not_in(select(inserted.c.title)))
+        .add_cte(links, facets)
+    )
+    rejected.extend((line, "There is already a Game with this title") for line in result.scalars())
+    inserted_count = len(rows) - len(rejected)
+    titles = []
+    if inserted_count:
+        await touch_profiles(db, [user_id])
+        result = await db.execute(
+            select(games.c.id, games.c.title)
+            .join(game_import, game_import.c.title==games.c.title)
+        )
+        titles = result.all()
     await db.commit()
-    return new_game
+    for game_id, title in titles:
+        title_index.add(game_id, title)
+    return inserted_count, sorted(rejected)
 
 async def get_game_by_title(db: AsyncSession, title: str):
     result = await db.execute(
@@ -42,22 +175,87 @@ async def get_game(db: AsyncSession, game_id: int):
     )
     return result.scalars().first()
 
-async def get_games(db: AsyncSession, skip: int = 0, limit: int = 100):
+async def get_game_record(db: AsyncSession, game_id: int, version):
+    """Serialized game read through ``game_cache`` and the version it is at.
+
+    ``version`` is the ``(version, updated_at)`` row the caller already has.
+    A cache miss may load a newer game, whose own version is returned then.
+    """
+    record = game_cache.get(game_id, version.version)
+    if record is not None:
+        return record, version
+    game = await get_game(db=db, game_id=game_id)
+    if game is None:
+        return None
+    record = GameOut.from_orm(game).json().encode()
+    game_cache.set(game_id, game.version, record, tags=[genre.id for genre in game.genres])
+    return record, game
+
+async def get_game_titles(db: AsyncSession):
+    result = await db.execute(select(Game.id, Game.title))
+    return result.all()
+
+async def get_games(db: AsyncSession, page: Page = Page(), filters: GameFilters = GameFilters(), sort: GameSort = GameSort()):
     result = await db.execute(
-        select(Game)
+        page.apply(filters.apply(select(Game)), *sort.columns, descending=sort.descending)
+        .options(selectinload(Game.genres))
+    )
+    return page.slice(result.scalars().fetchall(), key=sort.key)
+
+async def stream_games(db: AsyncSession, filters: GameFilters = GameFilters(), batch_size: int = 1000):
+    """Yield batches of plain game rows, genre titles included, from a server-side cursor."""
+    genres = (
+        select(func.array_agg(aggregate_order_by(Genre.title, Genre.title)))
+        .join_from(game_genre, Genre, Genre.id==game_genre.c.genre_id)
+        .where(game_genre.c.game_id==Game.id)
+        .scalar_subquery()
+    )
+    result = await db.stream(
+        filters.apply(select(
+            Game.id,
+            Game.title,
+            Game.developer,
+            Game.publisher,
+            Game.date_release,
+            Game.image,
+            Game.user_id,
+            genres.label("genres")
+        ))
         .order_by(Game.id)
-        .offset(skip)
+        .execution_options(yield_per=batch_size)
+    )
+    async for rows in result.mappings().partitions():
+        yield rows
+
+async def search_games(db: AsyncSession, q: str, limit: int = 20):
+    """Rank games by the weighted full-text match plus title trigram similarity.
+
+    Titles within the pg_trgm word similarity threshold match even when the
+    words are misspelled.
+    """
+    query = func.websearch_to_tsquery("english", q)
+    rank = func.ts_rank(game_search_vector, query) + func.word_similarity(q, Game.title)
+    result = await db.execute(
+        select(Game)
+        .where(or_(game_search_vector.op("@@")(query), Game.title.op("%>")(q)))
+        .order_by(rank.desc(), Game.id)
         .limit(limit)
         .options(selectinload(Game.genres))
     )
     return result.scalars().fetchall()
 
 async def delete_game(db: AsyncSession, game_id: int):
-    await db.execute(
+    await touch_games(db, [game_id])
+    await count_game_facets(db, [game_id], -1)
+    result = await db.execute(
         delete(Game)
         .where(Game.id==game_id)
+        .returning(Game.user_id)
     )
+    await touch_profiles(db, result.scalars().all())
     await db.commit()
+    game_cache.invalidate(game_id)
+    title_index.remove(game_id)
     return True
 
 async def is_users_game(db: AsyncSession, game_id: int, user_id: int):
@@ -68,22 +266,165 @@ async def is_users_game(db: AsyncSession, game_id: int, user_id: int):
     )
     return result.scalars().first()
 
-async def update_game(db: AsyncSession, game: Game, new_game: GameUpdate):
-    game.title = new_game.title
-    game.publisher = new_game.publisher
-    game.developer = new_game.developer
-    game.date_release = new_game.date_release
+def _genres_json(game_id):
+    # Core columns only: ORM entities here would drop the statement's add_cte() CTEs.
+    genres = Genre.__table__
+    return type_coerce(
+        select(
+            func.coalesce(
+                func.json_agg(aggregate_order_by(
+                    func.json_build_object("id", genres.c.id, "title", genres.c.title, "user_id", genres.c.user_id),
+                    genres.c.id
+                )),
+                text("'[]'::json")
+            )
+        )
+        .join_from(game_genre, genres, genres.c.id==game_genre.c.genre_id)
+        .where(game_genre.c.game_id==game_id)
+        .scalar_subquery(),
+        JSON
+    )
+
+async def update_game(db: AsyncSession, game_id: int, user_id: int, new_game: GameUpdate):
+    """Update an own game in one statement that also returns it with its genres.
+
+    Raises NotFoundError, NotOwnerError or, on a taken title, ConflictError.
+    """
+    games = Game.__table__
+    # Lock first: the statement below then reads the latest committed values
+    # into ``target``, whose facets it decrements.
+    await db.execute(
+        select(games.c.id)
+        .where(games.c.id==game_id)
+        .with_for_update()
+    )
+    target = (
+        select(games.c.id, games.c.user_id, games.c.date_release, games.c.publisher)
+        .where(games.c.id==game_id)
+        .cte("target")
+    )
+    updated = (
+        update(games)
+        .where(games.c.id==game_id)
+        .where(games.c.user_id==user_id)
+        .values(
+            title=new_game.title,
+            publisher=new_game.publisher,
+            developer=new_game.developer,
+            date_release=new_game.date_release,
+            version=games.c.version + 1,
+            updated_at=func.now()
+        )
+        .returning(*Game.__mapper__.columns)
+        .cte("updated")
+    )
+    touches = [
+        profile_touch(select(updated.c.user_id)).cte("touched"),
+        *(
+            statement.cte(f"touched_containers_{number}")
+            for number, statement in enumerate(container_touches(select(updated.c.id)))
+        ),
+        facet_upsert(
+            *game_facet_rows(select(target).where(target.c.id.in_(select(updated.c.id))).subquery(), -1),
+            *game_facet_rows(updated, 1)
+        ).cte("facets")
+    ]
+    try:
+        result = await db.execute(
+            select(target.c.user_id.label("owner_id"), *updated.c, _genres_json(updated.c.id).label("genres"))
+            .select_from(target)
+            .outerjoin(updated, true())
+            .add_cte(*touches)
+        )
+    except IntegrityError as e:
+        await db.rollback()
+        if is_unique_violation(e):
+            raise ConflictError("There is already a Game with this title")
+        raise
+    row = result.mappings().first()
+    if row is None:
+        raise NotFoundError("Game not Found")
+    if row["id"] is None:
+        raise NotOwnerError("The game does not belong to this user")
+    await db.commit()
+    game_cache.invalidate(game_id)
+    title_index.add(game_id, row["title"])
+    return {column: row[column] for column in updated.c.keys()} | {"genres": row["genres"]}
+
+async def replace_genres_for_game(db: AsyncSession, game_id: int, user_id: int, genre_ids: list[int]):
+    """Make ``genre_ids`` the exact genre set of an own game.
+
+    Only the difference is written; returns the added and removed ids.
+    """
+    result = await db.execute(
+        select(Game.user_id)
+        .where(Game.id==game_id)
+        .with_for_update()
+    )
+    owner_id = result.scalar()
+    if owner_id is None:
+        raise NotFoundError("Game not Found")
+    if owner_id != user_id:
+        raise NotOwnerError("The game does not belong to this user")
+    genre_ids = sorted(set(genre_ids))
+    if genre_ids:
+        result = await db.execute(
+            select(Genre.id)
+            .where(Genre.id.in_(genre_ids))
+            .with_for_update(read=True)
+        )
+        missing = set(genre_ids) - set(result.scalars())
+        if missing:
+            raise NotFoundError(f"Genres not Found: {', '.join(str(genre_id) for genre_id in sorted(missing))}")
+        result = await db.execute(
+            insert(game_genre)
+            .values([{"game_id": game_id, "genre_id": genre_id} for genre_id in genre_ids])
+            .on_conflict_do_nothing()
+            .returning(game_genre.c.genre_id)
+        )
+        added = sorted(result.scalars())
+    else:
+        added = []
+    result = await db.execute(
+        delete(game_genre)
+        .where(game_genre.c.game_id==game_id)
+        .where(game_genre.c.genre_id.not_in(genre_ids))
+        .returning(game_genre.c.genre_id)
+    )
+    removed = sorted(result.scalars())
+    if added or removed:
+        await count_genre_facets(db, added, 1)
+        await count_genre_facets(db, removed, -1)
+        await touch_profiles(db, [user_id])
+        await touch_games(db, [game_id])
+    await db.commit()
+    game_cache.invalidate(game_id)
+    return {"game_id": game_id, "added": added, "removed": removed}
+
+async def set_game_image(db: AsyncSession, game: Game, image: str):
+    game.image = image
+    await touch_profiles(db, [game.user_id])
+    await touch_games(db, [game.id])
     await db.commit()
+    game_cache.invalidate(game.id)
     return game
 
 async def update_genres_for_game(db: AsyncSession, game: Game, genre: Genre):
     game.genres.append(genre)
+    await count_genre_facets(db, [genre.id], 1)
+    await touch_profiles(db, [game.user_id])
+    await touch_games(db, [game.id])
     await db.commit()
+    game_cache.invalidate(game.id)
     return game
 
 async def clear_genres_for_game(db: AsyncSession, game: Game, genre: Genre):
     game.genres.remove(genre)
+    await count_genre_facets(db, [genre.id], -1)
+    await touch_profiles(db, [game.user_id])
+    await touch_games(db, [game.id])
     await db.commit()
+    game_cache.invalidate(game.id)
     return game
 
 async def is_genre_in_game(db: AsyncSession, game_id: int, genre_id: int):
@@ -1,16 +1,30 @@
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, update, union, func, true
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.models import Genre
-from api.schemas import GenreCreate, GenreUpdate
+from api.cache import game_cache, genre_cache
+from api.crud.facets import drop_genre_facets
+from api.crud.users import profile_touch, touch_profiles
+from api.crud.versions import game_touches, genre_game_ids, touch_games
+from api.exceptions import NotFoundError, NotOwnerError, ConflictError, is_unique_violation
+from api.models import Genre, Game, game_genre
+from api.pagination import Page
+from api.schemas import GenreCreate, GenreUpdate, Genre as GenreOut
 
 
+def _genre_owners(genre_id: int):
+    return union(
+        select(Genre.user_id).where(Genre.id==genre_id),
+        select(Game.user_id).join(game_genre, game_genre.c.game_id==Game.id).where(game_genre.c.genre_id==genre_id)
+    )
+
 async def create_genre(db: AsyncSession, genre: GenreCreate):
     new_genre = Genre(
         title=genre.title,
         user_id=genre.user_id
     )
     db.add(new_genre)
+    await touch_profiles(db, [new_genre.user_id])
     await db.commit()
     return new_genre
 
@@ -21,6 +35,21 @@ async def get_genre(db: AsyncSession, genre_id: int):
     )
     return result.scalars().first()
 
+async def get_genre_record(db: AsyncSession, genre_id: int, version):
+    """Serialized genre read through ``genre_cache`` and the version it is at.
+
+    Like ``get_game_record``, a cache miss returns the version of the loaded row.
+    """
+    record = genre_cache.get(genre_id, version.version)
+    if record is not None:
+        return record, version
+    genre = await get_genre(db=db, genre_id=genre_id)
+    if genre is None:
+        return None
+    record = GenreOut.from_orm(genre).json().encode()
+    genre_cache.set(genre_id, genre.version, record)
+    return record, genre
+
 async def get_genre_by_title(db: AsyncSession, title: str):
     result = await db.execute(
         select(Genre)
@@ -28,21 +57,23 @@ async def get_genre_by_title(db: AsyncSession, title: str):
     )
     return result.scalars().first()
 
-async def get_genres(db: AsyncSession, skip: int = 0, limit: int = 100):
+async def get_genres(db: AsyncSession, page: Page = Page()):
     result = await db.execute(
-        select(Genre)
-        .order_by(Genre.id)
-        .offset(skip)
-        .limit(limit)
+        page.apply(select(Genre), Genre.id)
     )
-    return result.scalars().fetchall()
+    return page.slice(result.scalars().fetchall(), key=lambda genre: [genre.id])
 
 async def delete_genre(db: AsyncSession, genre_id: int):
+    await touch_profiles(db, _genre_owners(genre_id))
+    await touch_games(db, genre_game_ids([genre_id]))
+    await drop_genre_facets(db, genre_id)
     await db.execute(
         delete(Genre)
         .where(Genre.id==genre_id)
     )
     await db.commit()
+    genre_cache.invalidate(genre_id)
+    game_cache.invalidate_tag(genre_id)
     return True
 
 async def is_users_genre(db: AsyncSession, genre_id: int, user_id: int):
@@ -53,7 +84,46 @@ async def is_users_genre(db: AsyncSession, genre_id: int, user_id: int):
     )
     return result.scalars().first()
 
-async def update_genre(db: AsyncSession, genre: Genre, new_genre: GenreUpdate):
-    genre.title = new_genre.title
+async def update_genre(db: AsyncSession, genre_id: int, user_id: int, new_genre: GenreUpdate):
+    """Rename an own genre in one statement, see ``update_game``."""
+    genres = Genre.__table__
+    target = select(genres.c.id, genres.c.user_id).where(genres.c.id==genre_id).cte("target")
+    updated = (
+        update(genres)
+        .where(genres.c.id==genre_id)
+        .where(genres.c.user_id==user_id)
+        .values(title=new_genre.title, version=genres.c.version + 1, updated_at=func.now())
+        .returning(*Genre.__mapper__.columns)
+        .cte("updated")
+    )
+    touched_games = [
+        statement.cte(f"touched_games_{number}")
+        for number, statement in enumerate(game_touches(genre_game_ids(select(updated.c.id))))
+    ]
+    touched = profile_touch(
+        select(Game.user_id)
+        .join(game_genre, game_genre.c.game_id==Game.id)
+        .where(game_genre.c.genre_id==updated.c.id)
+        .union(select(updated.c.user_id))
+    ).cte("touched")
+    try:
+        result = await db.execute(
+            select(target.c.user_id.label("owner_id"), *updated.c)
+            .select_from(target)
+            .outerjoin(updated, true())
+            .add_cte(touched, *touched_games)
+        )
+    except IntegrityError as e:
+        await db.rollback()
+        if is_unique_violation(e):
+            raise ConflictError("There is already a Genre with this title")
+        raise
+    row = result.mappings().first()
+    if row is None:
+        raise NotFoundError("Genre not Found")
+    if row["id"] is None:
+        raise NotOwnerError("Genre does not belong to this user")
     await db.commit()
-    return genre
+    genre_cache.invalidate(genre_id)
+    game_cache.invalidate_tag(genre_id)
+    return {column: row[column] for column in updated.c.keys()}
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.models import LoginBucket
+
+
+async def consume_login_bucket(db: AsyncSession, key: str, capacity: int, rate: float):
+    stmt = insert(LoginBucket).values(
+        key=key,
+        tokens=capacity - 1,
+        updated_at=func.clock_timestamp()
+    )
+    refilled = func.least(
+        capacity,
+        LoginBucket.tokens + func.extract("epoch", stmt.excluded.updated_at - LoginBucket.updated_at) * rate
+    )
+    result = await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[LoginBucket.key],
+            set_={"tokens": refilled - 1, "updated_at": stmt.excluded.updated_at},
+            where=refilled >= 1
+        )
+        .returning(LoginBucket.tokens)
+    )
+    allowed = result.first() is not None
+    await db.commit()
+    return allowed
+
+async def purge_login_buckets(db: AsyncSession, idle_seconds: float):
+    await db.execute(
+        delete(LoginBucket)
+        .where(LoginBucket.updated_at < func.now() - timedelta(seconds=idle_seconds))
+    )
+    await db.commit()
+    return True
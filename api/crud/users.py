@@ -1,29 +1,74 @@
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, update, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from passlib.context import CryptContext
 
-from api.models import User, Backlog, Game, CompleteGame
-from api.schemas import UserCreate, UserUpdate
+from api.cache import principal_cache, revoked_token_versions
+from api.exceptions import NotFoundError, ConflictError, is_unique_violation
+from api.hashing import get_password_hash
+from api.models import User, Backlog, Game, CompleteGame, Genre, backlog_game, completegame_game
+from api.pagination import Page
+from api.schemas import UserCreate, UserUpdate, Principal, Backlog as BacklogSchema, CompleteGame as CompleteGameSchema
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def _user_graph_options():
+    return (
+        selectinload(User.backlog),
+        selectinload(User.complete_game),
+        selectinload(User.games).selectinload(Game.genres),
+        selectinload(User.genres),
+    )
 
 async def get_user_by_name(db: AsyncSession, username: str):
     result = await db.execute(
         select(User)
         .where(User.username==username)
-        .options(selectinload(User.backlog).selectinload(Backlog.games).selectinload(Game.genres))
-        .options(selectinload(User.complete_game).selectinload(CompleteGame.games).selectinload(Game.genres))
-        .options(selectinload(User.games).selectinload(Game.genres))
-        .options(selectinload(User.genres))
+        .options(*_user_graph_options())
+    )
+    return result.scalars().first()
+
+async def get_user(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(User)
+        .where(User.id==user_id)
+        .options(*_user_graph_options())
     )
     return result.scalars().first()
 
+async def get_user_credentials(db: AsyncSession, username: str):
+    result = await db.execute(
+        select(User.id, User.username, User.hashed_password, User.token_version)
+        .where(User.username==username)
+    )
+    return result.first()
+
+async def get_principal(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(
+            User.id,
+            User.username,
+            User.token_version,
+            Backlog.id.label("backlog_id"),
+            CompleteGame.id.label("complete_game_id")
+        )
+        .outerjoin(Backlog, Backlog.user_id==User.id)
+        .outerjoin(CompleteGame, CompleteGame.user_id==User.id)
+        .where(User.id==user_id)
+    )
+    row = result.mappings().first()
+    if row is None:
+        return None
+    return Principal(
+        id=row["id"],
+        username=row["username"],
+        token_version=row["token_version"],
+        backlog=BacklogSchema(id=row["backlog_id"], user_id=row["id"]) if row["backlog_id"] else None,
+        complete_game=CompleteGameSchema(id=row["complete_game_id"], user_id=row["id"]) if row["complete_game_id"] else None
+    )
+
 async def create_user(db: AsyncSession, user: UserCreate):
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     new_user = User(
         username=user.username,
         hashed_password=hashed_password,
@@ -36,28 +81,137 @@ async def create_user(db: AsyncSession, user: UserCreate):
     await db.commit()
     return new_user
 
-async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100):
+async def get_existing_usernames(db: AsyncSession, usernames: list[str]):
     result = await db.execute(
-        select(User)
-        .order_by(User.id)
-        .offset(skip)
-        .limit(limit)
-        .options(selectinload(User.backlog).selectinload(Backlog.games).selectinload(Game.genres))
-        .options(selectinload(User.complete_game).selectinload(CompleteGame.games).selectinload(Game.genres))
-        .options(selectinload(User.games).selectinload(Game.genres))
-        .options(selectinload(User.genres))
+        select(User.username)
+        .where(User.username.in_(usernames))
     )
-    return result.scalars().fetchall()
+    return set(result.scalars().all())
+
+async def create_users(db: AsyncSession, users: list[dict]):
+    result = await db.execute(
+        insert(User)
+        .values(users)
+        .on_conflict_do_nothing(index_elements=[User.username])
+        .returning(User.id, User.username)
+    )
+    created = {username: user_id for user_id, username in result.all()}
+    await db.commit()
+    return created
+
+async def get_users(db: AsyncSession, page: Page = Page()):
+    games_count = (
+        select(func.count())
+        .select_from(Game)
+        .where(Game.user_id==User.id)
+        .scalar_subquery()
+    )
+    genres_count = (
+        select(func.count())
+        .select_from(Genre)
+        .where(Genre.user_id==User.id)
+        .scalar_subquery()
+    )
+    backlog_games_count = (
+        select(func.count())
+        .select_from(backlog_game)
+        .where(backlog_game.c.backlog_id==Backlog.id)
+        .scalar_subquery()
+    )
+    complete_games_count = (
+        select(func.count())
+        .select_from(completegame_game)
+        .where(completegame_game.c.complete_game_id==CompleteGame.id)
+        .scalar_subquery()
+    )
+    summaries = (
+        select(
+            User.id,
+            User.username,
+            Backlog.id.label("backlog_id"),
+            CompleteGame.id.label("complete_game_id"),
+            games_count.label("games_count"),
+            genres_count.label("genres_count"),
+            backlog_games_count.label("backlog_games_count"),
+            complete_games_count.label("complete_games_count")
+        )
+        .outerjoin(Backlog, Backlog.user_id==User.id)
+        .outerjoin(CompleteGame, CompleteGame.user_id==User.id)
+    )
+    result = await db.execute(page.apply(summaries, User.id))
+    return page.slice(result.mappings().fetchall(), key=lambda user: [user["id"]])
 
 async def delete_user(db: AsyncSession, username: str):
-    await db.execute(
+    result = await db.execute(
         delete(User).
         where(User.username==username)
+        .returning(User.id)
     )
+    user_ids = result.scalars().all()
     await db.commit()
+    for user_id in user_ids:
+        principal_cache.invalidate_user(user_id)
     return True
 
-async def update_user(db: AsyncSession, user: User, new_user: UserUpdate):
-    user.username = new_user.username
+async def update_user(db: AsyncSession, user_id: int, new_user: UserUpdate):
+    try:
+        result = await db.execute(
+            update(User)
+            .where(User.id==user_id)
+            .values(username=new_user.username, profile_version=User.profile_version + 1)
+            .returning(User.id)
+        )
+    except IntegrityError as e:
+        await db.rollback()
+        if is_unique_violation(e):
+            raise ConflictError("Username is already exists")
+        raise
+    if result.scalar() is None:
+        raise NotFoundError("User not Found")
     await db.commit()
-    return user
+    principal_cache.invalidate_user(user_id)
+    return user_id
+
+async def revoke_user_tokens(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        update(User)
+        .where(User.id==user_id)
+        .values(token_version=User.token_version + 1)
+        .returning(User.token_version)
+    )
+    token_version = result.scalar_one()
+    await db.commit()
+    revoked_token_versions.revoke(user_id, token_version)
+    principal_cache.invalidate_user(user_id)
+    return token_version
+
+async def get_revoked_token_versions(db: AsyncSession):
+    result = await db.execute(
+        select(User.id, User.token_version)
+        .where(User.token_version > 0)
+    )
+    return result.all()
+
+async def get_profile_version(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(User.profile_version)
+        .where(User.id==user_id)
+    )
+    return result.scalars().first()
+
+def profile_touch(user_ids):
+    """Statement bumping ``profile_version``, usable as a data-modifying CTE."""
+    users = User.__table__
+    return (
+        update(users)
+        .where(users.c.id.in_(user_ids))
+        .values(profile_version=users.c.profile_version + 1)
+    )
+
+async def touch_profiles(db: AsyncSession, user_ids):
+    await db.execute(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(profile_version=User.profile_version + 1)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,66 @@
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.models import Backlog, CompleteGame, Game, Genre, backlog_game, completegame_game, game_genre
+
+
+def bump_version(model):
+    """UPDATE that moves ``version`` and ``updated_at`` of ``model`` rows forward."""
+    table = model.__table__
+    return update(table).values(version=table.c.version + 1, updated_at=func.now())
+
+def game_touches(game_ids):
+    """Statements bumping the games and every backlog and completed list holding them.
+
+    ``game_ids`` may be a list or a select, so the statements can also be
+    used as data-modifying CTEs.
+    """
+    return [bump_version(Game).where(Game.__table__.c.id.in_(game_ids)), *container_touches(game_ids)]
+
+def container_touches(game_ids):
+    backlogs = Backlog.__table__
+    complete_games = CompleteGame.__table__
+    return [
+        bump_version(Backlog).where(backlogs.c.id.in_(
+            select(backlog_game.c.backlog_id).where(backlog_game.c.game_id.in_(game_ids))
+        )),
+        bump_version(CompleteGame).where(complete_games.c.id.in_(
+            select(completegame_game.c.complete_game_id).where(completegame_game.c.game_id.in_(game_ids))
+        )),
+    ]
+
+def genre_game_ids(genre_ids):
+    return select(game_genre.c.game_id).where(game_genre.c.genre_id.in_(genre_ids))
+
+async def touch_games(db: AsyncSession, game_ids):
+    for statement in game_touches(game_ids):
+        await db.execute(statement)
+
+async def touch_genres(db: AsyncSession, genre_ids):
+    await db.execute(bump_version(Genre).where(Genre.__table__.c.id.in_(genre_ids)))
+    await touch_games(db, genre_game_ids(genre_ids))
+
+async def touch_backlogs(db: AsyncSession, backlog_ids):
+    await db.execute(bump_version(Backlog).where(Backlog.__table__.c.id.in_(backlog_ids)))
+
+async def touch_complete_games(db: AsyncSession, complete_game_ids):
+    await db.execute(bump_version(CompleteGame).where(CompleteGame.__table__.c.id.in_(complete_game_ids)))
+
+async def _get_version(db: AsyncSession, model, entity_id: int):
+    result = await db.execute(
+        select(model.version, model.updated_at)
+        .where(model.id==entity_id)
+    )
+    return result.first()
+
+async def get_game_version(db: AsyncSession, game_id: int):
+    return await _get_version(db, Game, game_id)
+
+async def get_genre_version(db: AsyncSession, genre_id: int):
+    return await _get_version(db, Genre, genre_id)
+
+async def get_backlog_version(db: AsyncSession, backlog_id: int):
+    return await _get_version(db, Backlog, backlog_id)
+
+async def get_complete_game_version(db: AsyncSession, complete_game_id: int):
+    return await _get_version(db, CompleteGame, complete_game_id)
@@ -16,4 +16,8 @@ async_session = sessionmaker(
 
 async def get_session() -> AsyncSession:
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+def get_session_factory():
+    """Factory for sessions that outlive the request, e.g. in background tasks."""
+    return async_session
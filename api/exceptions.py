@@ -0,0 +1,33 @@
+from sqlalchemy.exc import IntegrityError
+
+
+class NotFoundError(Exception):
+    pass
+
+
+class ConflictError(Exception):
+    pass
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+class NotOwnerError(Exception):
+    pass
+
+
+class NotInListError(Exception):
+    pass
+
+
+class PayloadTooLargeError(Exception):
+    pass
+
+
+class UnsupportedMediaTypeError(Exception):
+    pass
+
+
+def is_unique_violation(error: IntegrityError):
+    return getattr(error.orig, "sqlstate", None) == "23505"
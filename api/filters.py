@@ -0,0 +1,108 @@
+from datetime import date
+from typing import Annotated, Literal
+
+from fastapi import Query
+from sqlalchemy import exists, select, func
+
+from api.models import Game, backlog_game, game_genre
+
+
+GAME_SORT_COLUMNS = {
+    "id": (Game.id,),
+    "title": (Game.title, Game.id),
+    "date_release": (Game.date_release, Game.id),
+}
+
+
+class GameFilters:
+    """Query parameters that narrow a list of games, compiled to WHERE clauses.
+
+    Every ``genre_id`` has to be attached to the game.
+    """
+
+    def __init__(
+        self,
+        genre_id: Annotated[list[int] | None, Query()] = None,
+        developer: str | None = None,
+        publisher: str | None = None,
+        released_from: date | None = None,
+        released_to: date | None = None
+    ):
+        self.genre_ids = genre_id or []
+        self.developer = developer
+        self.publisher = publisher
+        self.released_from = released_from
+        self.released_to = released_to
+
+    def apply(self, query):
+        for genre_id in self.genre_ids:
+            query = query.where(
+                exists()
+                .where(game_genre.c.game_id==Game.id)
+                .where(game_genre.c.genre_id==genre_id)
+            )
+        if self.developer is not None:
+            query = query.where(Game.developer==self.developer)
+        if self.publisher is not None:
+            query = query.where(Game.publisher==self.publisher)
+        if self.released_from is not None:
+            query = query.where(Game.date_release >= self.released_from)
+        if self.released_to is not None:
+            query = query.where(Game.date_release <= self.released_to)
+        return query
+
+
+class GameSort:
+    def __init__(
+        self,
+        sort: Literal["id", "title", "date_release"] = "id",
+        order: Literal["asc", "desc"] = "asc"
+    ):
+        self.columns = GAME_SORT_COLUMNS[sort]
+        self.descending = order == "desc"
+
+    def key(self, game):
+        return [getattr(game, column.key) for column in self.columns]
+
+
+class BacklogGameSort(GameSort):
+    """Sort of the games of a backlog, which also knows the backlog's own order.
+
+    Rows are ``(Game, position)`` pairs rather than bare games.
+    """
+
+    def __init__(
+        self,
+        sort: Literal["position", "id", "title", "date_release"] = "position",
+        order: Literal["asc", "desc"] = "asc"
+    ):
+        if sort == "position":
+            self.columns = (backlog_game.c.position, Game.id)
+            self.descending = order == "desc"
+        else:
+            super().__init__(sort, order)
+
+    def key(self, row):
+        return [row.position if column is backlog_game.c.position else getattr(row.Game, column.key) for column in self.columns]
+
+    def anchor(self, backlog_id: int):
+        """``Page.apply`` anchor resuming a position cursor from its game's current rank.
+
+        Respreads rewrite every rank of a backlog while keeping the order,
+        so the rank stored in the cursor is only used once its game has
+        left the backlog.
+        """
+        if self.columns[0] is not backlog_game.c.position:
+            return None
+
+        def anchor(after):
+            position, game_id = after
+            current = (
+                select(backlog_game.c.position)
+                .where(backlog_game.c.backlog_id==backlog_id)
+                .where(backlog_game.c.game_id==game_id)
+                .scalar_subquery()
+            )
+            return [func.coalesce(current, position), game_id]
+
+        return anchor
@@ -0,0 +1,105 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from passlib.context import CryptContext
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASH_MAX_CONCURRENCY = int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", PASSWORD_HASH_WORKERS))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash(password: str):
+    return pwd_context.hash(password)
+
+def _verify(plain_password: str, hashed_password: str):
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a process pool so it never blocks the event loop.
+
+    At most ``max_concurrency`` calls are handed to the pool at once, the
+    rest wait on a semaphore and are reported as ``queued``. A pool broken
+    by a crashed worker is replaced and the call retried once.
+    """
+
+    def __init__(self, workers: int, max_concurrency: int):
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = None
+
+    async def hash(self, password: str):
+        return await self._run(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str):
+        return await self._run(_verify, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "completed": self.completed,
+        }
+
+    async def _run(self, func, *args):
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+                return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        # Concurrent calls may all see the same broken pool, only replace it once.
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(workers=PASSWORD_HASH_WORKERS, max_concurrency=PASSWORD_HASH_MAX_CONCURRENCY)
+
+
+async def get_password_hash(password: str):
+    return await password_hasher.hash(password)
+
+async def verify_password(plain_password: str, hashed_password: str):
+    return await password_hasher.verify(plain_password, hashed_password)
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import re
+import uuid
+
+import anyio
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+from dotenv import load_dotenv
+
+from api.exceptions import PayloadTooLargeError, UnsupportedMediaTypeError
+
+
+load_dotenv()
+
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", "images")
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", 10 * 1024 * 1024))
+
+IMAGE_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def sniff_media_type(head: bytes):
+    for signature, media_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return media_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class ImageStore:
+    """Images on the local disk, stored once under the sha256 of their content."""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def path(self, digest: str):
+        return os.path.join(self.root, digest[:2], digest)
+
+    async def save(self, chunks):
+        """Stream ``chunks`` to disk while hashing them and return the digest.
+
+        The body is written to a temporary file first and moved into place
+        only when no image with the same content is stored yet.
+        """
+        tmp_dir = os.path.join(self.root, "tmp")
+        await anyio.to_thread.run_sync(lambda: os.makedirs(tmp_dir, exist_ok=True))
+        tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+        sha256 = hashlib.sha256()
+        head = b""
+        size = 0
+        try:
+            async with await anyio.open_file(tmp_path, "wb") as file:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise PayloadTooLargeError(f"Image is larger than {self.max_bytes} bytes")
+                    if len(head) < 12:
+                        head += chunk[:12]
+                    sha256.update(chunk)
+                    await file.write(chunk)
+            if sniff_media_type(head) is None:
+                raise UnsupportedMediaTypeError("Unsupported image type")
+            digest = sha256.hexdigest()
+            await anyio.to_thread.run_sync(self._commit, tmp_path, self.path(digest))
+        finally:
+            await anyio.to_thread.run_sync(self._discard, tmp_path)
+        return digest
+
+    async def open(self, digest: str):
+        """Return ``(path, stat_result, media_type)`` or None for an unknown digest."""
+        if not DIGEST_PATTERN.match(digest):
+            return None
+        path = self.path(digest)
+        try:
+            stat_result = await anyio.to_thread.run_sync(os.stat, path)
+        except FileNotFoundError:
+            return None
+        async with await anyio.open_file(path, "rb") as file:
+            head = await file.read(12)
+        return path, stat_result, sniff_media_type(head) or "application/octet-stream"
+
+    def _commit(self, tmp_path: str, path: str):
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    def _discard(self, tmp_path: str):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def parse_range(header: str | None, size: int):
+    """Return ``(start, end)`` of a single ``bytes=`` range, inclusive.
+
+    None means the header is absent or not understood and the whole file is
+    served; ValueError means the range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start = size - int(last)
+            end = size - 1
+    except ValueError:
+        return None
+    start = max(start, 0)
+    end = min(end, size - 1)
+    if start > end:
+        raise ValueError("Range Not Satisfiable")
+    return start, end
+
+
+class FileRangeResponse(FileResponse):
+    """FileResponse limited to ``[start, end]`` of the file.
+
+    The body goes through the ``http.response.zerocopysend`` extension when
+    the server offers it and is read in chunks otherwise.
+    """
+
+    def __init__(self, path: str, start: int, end: int, **kwargs):
+        super().__init__(path, **kwargs)
+        self.start = start
+        self.end = end
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.wrapped.fileno(),
+                    "offset": self.start,
+                    "count": self.end - self.start + 1,
+                })
+            else:
+                await file.seek(self.start)
+                remaining = self.end - self.start + 1
+                while remaining:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    remaining -= len(chunk)
+                    if not chunk:
+                        remaining = 0
+                    await send({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0,
+                    })
+        if self.background is not None:
+            await self.background()
+
+
+image_store = ImageStore(root=IMAGE_STORE_DIR, max_bytes=IMAGE_MAX_BYTES)
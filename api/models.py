@@ -1,6 +1,7 @@
-from datetime import date
+from datetime import date, datetime
 
-from sqlalchemy import Column, ForeignKey, Table
+from sqlalchemy import DDL, Column, Computed, DateTime, ForeignKey, Index, Integer, String, Table, event, func, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship, Mapped, mapped_column, MappedAsDataclass, DeclarativeBase
 from sqlalchemy.ext.asyncio import AsyncAttrs
 
@@ -9,14 +10,20 @@ class Base(AsyncAttrs, MappedAsDataclass, DeclarativeBase):
     pass
 
 
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+
 game_genre = Table("game_genre", Base.metadata,
                    Column("game_id", ForeignKey("games.id", ondelete="CASCADE"), primary_key=True),
-                   Column("genre_id", ForeignKey("genres.id", ondelete="CASCADE"), primary_key=True))
+                   Column("genre_id", ForeignKey("genres.id", ondelete="CASCADE"), primary_key=True),
+                   Index("ix_game_genre_genre_id_game_id", "genre_id", "game_id"))
 
 
 backlog_game = Table("backlog_game", Base.metadata, 
                      Column("backlog_id", ForeignKey("backlogs.id", ondelete="CASCADE"), primary_key=True), 
-                     Column("game_id", ForeignKey("games.id", ondelete="CASCADE"), primary_key=True))
+                     Column("game_id", ForeignKey("games.id", ondelete="CASCADE"), primary_key=True),
+                     Column("position", String(collation="C"), nullable=False),
+                     Index("ix_backlog_game_backlog_id_position", "backlog_id", "position"))
 
 
 completegame_game = Table("completegame_game", Base.metadata, 
@@ -24,8 +31,17 @@ completegame_game = Table("completegame_game", Base.metadata,
                           Column("game_id", ForeignKey("games.id", ondelete="CASCADE"), primary_key=True))
 
 
+game_facets = Table("game_facets", Base.metadata,
+                    Column("kind", String, primary_key=True),
+                    Column("value", String, primary_key=True),
+                    Column("count", Integer, nullable=False, server_default="0"))
+
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_revoked_token_versions", "id", "token_version", postgresql_where=text("token_version > 0")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True, autoincrement=True, init=False)
     username: Mapped[str] = mapped_column(nullable=False, unique=True, index=True)
@@ -34,26 +50,40 @@ class User(Base):
     complete_game: Mapped["CompleteGame"] = relationship("CompleteGame", backref="users", cascade="all, delete", passive_deletes=True)
     games: Mapped[list["Game"] | None] = relationship()
     genres: Mapped[list["Genre"] | None] = relationship()
+    token_version: Mapped[int] = mapped_column(default=0, server_default="0", init=False)
+    profile_version: Mapped[int] = mapped_column(default=0, server_default="0", init=False)
 
 
 class Backlog(Base):
     __tablename__ = "backlogs"
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True, autoincrement=True, init=False)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
-    games: Mapped[list["Game"]] = relationship(secondary=backlog_game)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    games: Mapped[list["Game"]] = relationship(secondary=backlog_game, order_by=(backlog_game.c.position, backlog_game.c.game_id), viewonly=True)
+    version: Mapped[int] = mapped_column(server_default="1", init=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), init=False)
 
 
 class CompleteGame(Base):
     __tablename__ = "completegames"
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True, autoincrement=True, init=False)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
     games: Mapped[list["Game"]] = relationship(secondary=completegame_game)
+    version: Mapped[int] = mapped_column(server_default="1", init=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), init=False)
 
 
 class Game(Base):
     __tablename__ = "games"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        Index("ix_games_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("ix_games_publisher_date_release", "publisher", "date_release"),
+        Index("ix_games_developer_date_release", "developer", "date_release"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True, autoincrement=True, init=False)
     title: Mapped[str] = mapped_column(nullable=False, unique=True, index=True)
@@ -61,13 +91,41 @@ class Game(Base):
     publisher: Mapped[str] = mapped_column(nullable=False)
     date_release: Mapped[date] = mapped_column(nullable=False)
     image: Mapped[str] = mapped_column(nullable=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
     genres: Mapped[list["Genre"]] = relationship(secondary=game_genre)
+    version: Mapped[int] = mapped_column(server_default="1", init=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), init=False)
+
+
+# Left unmapped so that loading or serializing a Game never pulls the vector.
+game_search_vector = Column(
+    "search_vector",
+    TSVECTOR,
+    Computed(
+        "setweight(to_tsvector('english', title), 'A') || "
+        "setweight(to_tsvector('english', developer), 'B') || "
+        "setweight(to_tsvector('english', publisher), 'C')",
+        persisted=True
+    )
+)
+Game.__table__.append_column(game_search_vector)
+Index("ix_games_search_vector", game_search_vector, postgresql_using="gin")
 
 
 class Genre(Base):
     __tablename__ = "genres"
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True, autoincrement=True, init=False)
     title: Mapped[str] = mapped_column(nullable=False, unique=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
+    version: Mapped[int] = mapped_column(server_default="1", init=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), init=False)
+
+
+class LoginBucket(Base):
+    __tablename__ = "login_buckets"
+
+    key: Mapped[str] = mapped_column(primary_key=True)
+    tokens: Mapped[float] = mapped_column(nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,97 @@
+import base64
+import json
+import os
+from datetime import date
+from typing import Annotated
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import tuple_
+from dotenv import load_dotenv
+
+from api.exceptions import InvalidCursorError
+
+
+load_dotenv()
+
+PAGE_LIMIT = int(os.getenv("PAGE_LIMIT", 100))
+
+
+class Page:
+    """Keyset position of a list request: the sort key of the last row seen."""
+
+    def __init__(self, after: list | None = None, limit: int = PAGE_LIMIT):
+        self.after = after
+        self.limit = limit
+
+    def apply(self, query, *columns, descending: bool = False, anchor=None):
+        """Order ``query`` by ``columns`` and start it right after the cursor.
+
+        ``anchor`` may map the decoded cursor values to the SQL expressions
+        to compare against. One extra row is fetched to tell whether there
+        is a next page.
+        """
+        if self.after is not None:
+            if len(self.after) != len(columns):
+                raise InvalidCursorError("Invalid cursor")
+            try:
+                after = [_from_json(column, value) for column, value in zip(columns, self.after)]
+            except (TypeError, ValueError):
+                raise InvalidCursorError("Invalid cursor")
+            if anchor is not None:
+                after = anchor(after)
+            if descending:
+                query = query.where(tuple_(*columns) < tuple_(*after))
+            else:
+                query = query.where(tuple_(*columns) > tuple_(*after))
+        order = [column.desc() if descending else column for column in columns]
+        return query.order_by(*order).limit(self.limit + 1)
+
+    def slice(self, rows, key):
+        """Return the rows of this page and the cursor of the next one, if any."""
+        rows = list(rows)
+        if len(rows) <= self.limit:
+            return rows, None
+        rows = rows[:self.limit]
+        return rows, encode_cursor(key(rows[-1]))
+
+
+def encode_cursor(values):
+    payload = json.dumps([value.isoformat() if isinstance(value, date) else value for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or not values or not all(isinstance(value, (int, str)) for value in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+def _from_json(column, value):
+    python_type = column.type.python_type
+    if python_type is date:
+        return date.fromisoformat(value)
+    if not isinstance(value, python_type):
+        raise TypeError(f"Expected {python_type.__name__}")
+    return value
+
+
+def page_params(
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=PAGE_LIMIT)] = PAGE_LIMIT
+):
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    return Page(after=after, limit=limit)
+
+def set_next_cursor(response: Response, next_cursor: str | None):
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
@@ -0,0 +1,93 @@
+import os
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+RANK_MAX_LENGTH = int(os.getenv("RANK_MAX_LENGTH", 12))
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+# Appends, prepends and respreads use ranks of at most RANK_WIDTH digits,
+# read as integers below RANK_SPACE. Keep RANK_MAX_LENGTH above RANK_WIDTH.
+RANK_WIDTH = 6
+RANK_SPACE = len(DIGITS) ** RANK_WIDTH
+RANK_STEP = len(DIGITS) ** 2
+
+
+def rank_between(before: str | None, after: str | None):
+    """Shortest rank that sorts strictly between ``before`` and ``after``.
+
+    None stands for the start or the end of the list. Ranks compare
+    bytewise (``COLLATE "C"`` in the database) and never end with the
+    lowest digit, so there is always room for another one in between.
+    """
+    if before is not None and after is not None and before >= after:
+        raise ValueError("before must sort before after")
+    return _midpoint(before or "", after)
+
+def rank_after(before: str | None):
+    """Rank for appending after ``before``, the last rank of a list.
+
+    Counts up by RANK_STEP at a fixed width, so long runs of appends keep
+    their ranks short. Only past the end of the space do ranks get longer.
+    """
+    if before is None:
+        return _to_rank(RANK_SPACE // 2)
+    value = _to_int(before) + RANK_STEP
+    if value >= RANK_SPACE:
+        return rank_between(before, None)
+    return _to_rank(value)
+
+def rank_before(after: str | None):
+    """Rank for prepending before ``after``, the first rank of a list."""
+    if after is None:
+        return _to_rank(RANK_SPACE // 2)
+    value = _to_int(after) - RANK_STEP
+    if value <= 0:
+        return rank_between(None, after)
+    return _to_rank(value)
+
+def ranks_after(before: str | None, count: int):
+    """``count`` ascending ranks appended after ``before``."""
+    ranks = []
+    for _ in range(count):
+        before = rank_after(before)
+        ranks.append(before)
+    return ranks
+
+def spread_ranks(count: int):
+    """``count`` ascending fixed-width ranks spread over the middle half of the space.
+
+    The outer quarters are left free for appends and prepends.
+    """
+    return [_to_rank(RANK_SPACE // 4 + (index + 1) * (RANK_SPACE // 2) // (count + 1)) for index in range(count)]
+
+def _to_int(rank: str):
+    # Longer ranks are truncated, which never rounds them up.
+    value = 0
+    for digit in rank[:RANK_WIDTH].ljust(RANK_WIDTH, DIGITS[0]):
+        value = value * len(DIGITS) + DIGITS.index(digit)
+    return value
+
+def _to_rank(value: int):
+    digits = []
+    for _ in range(RANK_WIDTH):
+        value, digit = divmod(value, len(DIGITS))
+        digits.append(DIGITS[digit])
+    return "".join(reversed(digits)).rstrip(DIGITS[0])
+
+def _midpoint(low: str, high: str | None):
+    if high is not None:
+        common = 0
+        while common < len(high) and (low[common] if common < len(low) else DIGITS[0]) == high[common]:
+            common += 1
+        if common:
+            return high[:common] + _midpoint(low[common:], high[common:])
+    low_digit = DIGITS.index(low[0]) if low else 0
+    high_digit = DIGITS.index(high[0]) if high is not None else len(DIGITS)
+    if high_digit - low_digit > 1:
+        return DIGITS[(low_digit + high_digit) // 2]
+    if high is not None and len(high) > 1:
+        return high[0]
+    return DIGITS[low_digit] + _midpoint(low[1:], None)
@@ -1,6 +1,6 @@
 from datetime import date
 
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 
 
 class Token(BaseModel):
@@ -9,7 +9,8 @@ class Token(BaseModel):
 
 
 class TokenData(BaseModel):
-    username: str | None = None
+    user_id: int | None = None
+    token_version: int = 0
 
 
 class GenreBase(BaseModel):
@@ -53,6 +54,58 @@ class GameUpdate(BaseModel):
     date_release: date
 
 
+class GameGenresDiff(BaseModel):
+    game_id: int
+    added: list[int]
+    removed: list[int]
+
+
+class GameTitle(BaseModel):
+    id: int
+    title: str
+
+
+class GenreFacet(BaseModel):
+    id: int
+    title: str
+    count: int
+
+
+class YearFacet(BaseModel):
+    year: int
+    count: int
+
+
+class PublisherFacet(BaseModel):
+    publisher: str
+    count: int
+
+
+class GameFacets(BaseModel):
+    genres: list[GenreFacet]
+    years: list[YearFacet]
+    publishers: list[PublisherFacet]
+
+
+class GameImportRow(BaseModel):
+    title: str
+    developer: str
+    publisher: str
+    date_release: date
+    image: str | None = None
+    genres: list[int] = []
+
+    @validator("image", pre=True)
+    def empty_image(cls, value):
+        return value or None
+
+    @validator("genres", pre=True)
+    def split_genres(cls, value):
+        if isinstance(value, str):
+            return [genre for genre in value.split(";") if genre.strip()]
+        return value or []
+
+
 class Game(GameBase):
     id: int
 
@@ -77,6 +130,10 @@ class BacklogOut(Backlog):
     games: list[Game]
 
 
+class BacklogHeader(Backlog):
+    game_count: int
+
+
 class CompleteGame(BaseModel):
     id: int
     user_id: int
@@ -89,6 +146,34 @@ class CompleteGameOut(CompleteGame):
     games: list[Game]
 
 
+class CompleteGameHeader(CompleteGame):
+    game_count: int
+
+
+class BacklogGamesDiff(BaseModel):
+    backlog_id: int
+    added: list[int]
+    removed: list[int]
+
+
+class BacklogGamePosition(BaseModel):
+    game_id: int
+    position: str
+
+
+class CompleteGameGamesDiff(BaseModel):
+    complete_game_id: int
+    added: list[int]
+    removed: list[int]
+
+
+class GameCompletion(BaseModel):
+    game_id: int
+    backlog_id: int
+    complete_game_id: int
+    added: bool
+
+
 class UserBase(BaseModel):
     username: str
 
@@ -105,6 +190,31 @@ class UserUpdate(UserBase):
     pass
 
 
+class BulkUserResult(BaseModel):
+    line: int
+    status: str
+    username: str | None = None
+    id: int | None = None
+    detail: str | None = None
+
+
+class Principal(UserBase):
+    id: int
+    token_version: int = 0
+    backlog: Backlog | None = None
+    complete_game: CompleteGame | None = None
+
+
+class UserSummary(UserBase):
+    id: int
+    backlog_id: int | None
+    complete_game_id: int | None
+    games_count: int
+    genres_count: int
+    backlog_games_count: int
+    complete_games_count: int
+
+
 class User(UserBase):
     id: int | None
     backlog: Backlog | None
@@ -0,0 +1,123 @@
+import math
+import os
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+
+from api.crud import consume_login_bucket, purge_login_buckets
+
+
+load_dotenv()
+
+LOGIN_THROTTLE_BACKEND = os.getenv("LOGIN_THROTTLE_BACKEND", "memory")
+LOGIN_THROTTLE_MAX_KEYS = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", 100000))
+LOGIN_USERNAME_BURST = int(os.getenv("LOGIN_USERNAME_BURST", 5))
+LOGIN_USERNAME_PER_MINUTE = float(os.getenv("LOGIN_USERNAME_PER_MINUTE", 5))
+LOGIN_CLIENT_BURST = int(os.getenv("LOGIN_CLIENT_BURST", 20))
+LOGIN_CLIENT_PER_MINUTE = float(os.getenv("LOGIN_CLIENT_PER_MINUTE", 60))
+
+
+class MemoryTokenBuckets:
+    """Token buckets of this worker, at most ``max_keys`` of them.
+
+    The least recently used bucket is dropped first; a dropped bucket
+    behaves like a full one.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    async def consume(self, db: AsyncSession, key: str, capacity: int, rate: float):
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed
+
+    def clear(self):
+        self._buckets.clear()
+
+    def stats(self):
+        return {"keys": len(self._buckets), "max_keys": self.max_keys}
+
+
+class DatabaseTokenBuckets:
+    """Token buckets shared by all workers through the login_buckets table.
+
+    Buckets idle long enough to be full again are purged at most once per
+    ``purge_interval`` seconds.
+    """
+
+    def __init__(self, idle_seconds: float, purge_interval: float = 300):
+        self.idle_seconds = idle_seconds
+        self.purge_interval = purge_interval
+        self._purged_at = None
+
+    async def consume(self, db: AsyncSession, key: str, capacity: int, rate: float):
+        if self._purged_at is None or time.monotonic() - self._purged_at >= self.purge_interval:
+            self._purged_at = time.monotonic()
+            await purge_login_buckets(db, idle_seconds=self.idle_seconds)
+        return await consume_login_bucket(db, key=key, capacity=capacity, rate=rate)
+
+    def clear(self):
+        self._purged_at = None
+
+    def stats(self):
+        return {"idle_seconds": self.idle_seconds}
+
+
+class LoginThrottle:
+    def __init__(self, backend, username_burst: int, username_per_minute: float, client_burst: int, client_per_minute: float):
+        self.backend = backend
+        self.username_burst = username_burst
+        self.username_rate = username_per_minute / 60
+        self.client_burst = client_burst
+        self.client_rate = client_per_minute / 60
+        self.rejected = 0
+
+    async def check(self, db: AsyncSession, username: str, client: str | None):
+        """Raise 429 when either the client or the username bucket is empty."""
+        limits = [
+            (f"client:{client}", self.client_burst, self.client_rate),
+            (f"username:{username.casefold()}", self.username_burst, self.username_rate),
+        ]
+        for key, capacity, rate in limits:
+            if not await self.backend.consume(db, key, capacity, rate):
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many login attempts",
+                    headers={"Retry-After": str(math.ceil(1 / rate))}
+                )
+
+    def clear(self):
+        self.backend.clear()
+        self.rejected = 0
+
+    def stats(self):
+        return {"rejected": self.rejected, **self.backend.stats()}
+
+
+def _login_buckets():
+    if LOGIN_THROTTLE_BACKEND == "database":
+        idle_seconds = max(LOGIN_USERNAME_BURST / LOGIN_USERNAME_PER_MINUTE, LOGIN_CLIENT_BURST / LOGIN_CLIENT_PER_MINUTE) * 60
+        return DatabaseTokenBuckets(idle_seconds=idle_seconds)
+    return MemoryTokenBuckets(max_keys=LOGIN_THROTTLE_MAX_KEYS)
+
+
+login_throttle = LoginThrottle(
+    backend=_login_buckets(),
+    username_burst=LOGIN_USERNAME_BURST,
+    username_per_minute=LOGIN_USERNAME_PER_MINUTE,
+    client_burst=LOGIN_CLIENT_BURST,
+    client_per_minute=LOGIN_CLIENT_PER_MINUTE
+)
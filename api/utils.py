@@ -1,15 +1,19 @@
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
+from pydantic import ValidationError
 from dotenv import load_dotenv
 
+from api.cache import principal_cache, revoked_token_versions
 from api.database import get_session
-from api.crud import get_user_by_name, pwd_context
+from api.crud import get_user_credentials, get_principal, get_revoked_token_versions
+from api.hashing import verify_password
 from api.schemas import TokenData
 
 
@@ -22,14 +26,59 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/token")
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def ndjson_lines(chunks):
+    """Yield ``(line_number, line)`` for every non-blank line of an NDJSON stream."""
+    buffer = b""
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, line
+    if buffer.strip():
+        yield line_number + 1, buffer
+
+def validation_detail(error: ValidationError):
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+def etag_matches(if_none_match: str | None, etag: str):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+def version_headers(etag: str, updated_at: datetime):
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(updated_at.astimezone(timezone.utc), usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+
+def is_not_modified(request: Request, etag: str, updated_at: datetime):
+    """Evaluate If-None-Match, or If-Modified-Since when no ETag was sent."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since:
+        return False
+    try:
+        modified_since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if modified_since.tzinfo is None:
+        return False
+    return updated_at.replace(microsecond=0) <= modified_since
 
 async def authenticate_user(db: AsyncSession, username: str, password: str):
-    user = await get_user_by_name(db, username)
+    user = await get_user_credentials(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return False
     return user
 
@@ -49,15 +98,23 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: As
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if revoked_token_versions.is_stale():
+        revoked_token_versions.load(await get_revoked_token_versions(db))
+    user = principal_cache.get(token)
+    if user is not None and not revoked_token_versions.is_revoked(user.id, user.token_version):
+        return user
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+        user_id: str = payload.get("sub")
+        if user_id is None:
             raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
+        token_data = TokenData(user_id=user_id, token_version=payload.get("ver", 0))
+    except (JWTError, ValidationError):
+        raise credentials_exception
+    if revoked_token_versions.is_revoked(token_data.user_id, token_data.token_version):
         raise credentials_exception
-    user = await get_user_by_name(db=db, username=token_data.username)
-    if user is None:
+    user = await get_principal(db=db, user_id=token_data.user_id)
+    if user is None or user.token_version != token_data.token_version:
         raise credentials_exception
+    principal_cache.set(token, user, exp=payload["exp"])
     return user
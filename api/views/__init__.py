@@ -2,4 +2,6 @@ from .users import user_router
 from .backlogs import backlog_router
 from .complete_games import complete_game_router
 from .genres import genre_router
-from .games import game_router
\ No newline at end of file
+from .games import game_router
+from .stats import stats_router
+from .images import image_router
\ No newline at end of file
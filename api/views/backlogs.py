@@ -1,21 +1,34 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, Request, Response, status
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
-from api.schemas import User, BacklogOut
+from api.schemas import Principal, Game, BacklogOut, BacklogHeader, BacklogGamesDiff, BacklogGamePosition, GameCompletion
 from api.crud import (
     create_backlog, 
     get_backlog, 
+    get_backlog_version, 
+    get_backlog_header,
+    get_backlog_games,
     get_backlogs, 
     delete_backlog, 
     get_game, 
     update_backlog, 
     is_game_in_backlog, 
-    clear_backlog
+    clear_backlog,
+    link_backlog_games,
+    unlink_backlog_games,
+    complete_backlog_game,
+    move_backlog_game,
+    rebalance_backlog
 )
-from api.utils import get_current_user, get_session
+from api.exceptions import InvalidCursorError, NotFoundError, NotInListError
+from api.filters import GameFilters, BacklogGameSort
+from api.pagination import Page, page_params, set_next_cursor
+from api.database import get_session_factory
+from api.utils import get_current_user, get_session, version_headers, is_not_modified
 
 
 backlog_router = APIRouter(
@@ -24,9 +37,14 @@ backlog_router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+async def _rebalance_in_background(session_factory: sessionmaker, backlog_id: int):
+    # Not the request's session: it may be closed before background tasks run.
+    async with session_factory() as db:
+        await rebalance_backlog(db=db, backlog_id=backlog_id)
+
 @backlog_router.post("/", response_model=BacklogOut)
 async def new_backlog(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)]
 ):
     if current_user.backlog:
@@ -41,26 +59,98 @@ async def new_backlog(
 
 @backlog_router.get("/{backlog_id}", response_model=BacklogOut)
 async def backlog_by_id(
-    current_user: Annotated[User, Depends(get_current_user)],
+    request: Request,
+    response: Response,
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     backlog_id: int
 ):
+    version = await get_backlog_version(db=db, backlog_id=backlog_id)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Backlog not Found"
+        )
+    etag = f'"backlog-{backlog_id}-{version.version}"'
+    headers = version_headers(etag, version.updated_at)
+    if is_not_modified(request, etag, version.updated_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     backlog = await get_backlog(db=db, backlog_id=backlog_id)
     if backlog is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Backlog not Found"
         )
+    response.headers.update(headers)
     return backlog
 
+@backlog_router.get("/{backlog_id}/header", response_model=BacklogHeader)
+async def backlog_header(
+    request: Request,
+    response: Response,
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)],
+    backlog_id: int
+):
+    version = await get_backlog_version(db=db, backlog_id=backlog_id)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Backlog not Found"
+        )
+    etag = f'"backlog-header-{backlog_id}-{version.version}"'
+    headers = version_headers(etag, version.updated_at)
+    if is_not_modified(request, etag, version.updated_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    header = await get_backlog_header(db=db, backlog_id=backlog_id)
+    if header is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Backlog not Found"
+        )
+    response.headers.update(headers)
+    return header
+
+@backlog_router.get("/{backlog_id}/games", response_model=list[Game])
+async def backlog_games(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)],
+    response: Response,
+    backlog_id: int,
+    page: Annotated[Page, Depends(page_params)],
+    filters: Annotated[GameFilters, Depends()],
+    sort: Annotated[BacklogGameSort, Depends()]
+):
+    if await get_backlog_version(db=db, backlog_id=backlog_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Backlog not Found"
+        )
+    try:
+        games, next_cursor = await get_backlog_games(db=db, backlog_id=backlog_id, page=page, filters=filters, sort=sort)
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    set_next_cursor(response, next_cursor)
+    return games
+
 @backlog_router.get("/", response_model=list[BacklogOut])
 async def all_backlogs(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
-    skip: int = 0,
-    limit: int = 100
+    response: Response,
+    page: Annotated[Page, Depends(page_params)]
 ):
-    backlogs = await get_backlogs(db=db, skip=skip, limit=limit)
+    try:
+        backlogs, next_cursor = await get_backlogs(db=db, page=page)
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    set_next_cursor(response, next_cursor)
     if backlogs is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -70,7 +160,7 @@ async def all_backlogs(
 
 @backlog_router.delete("/")
 async def remove_backlog(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)]
 ):
     if current_user.backlog is None:
@@ -84,8 +174,10 @@ async def remove_backlog(
 
 @backlog_router.put("/", response_model=BacklogOut)
 async def add_game_to_backlog(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
+    session_factory: Annotated[sessionmaker, Depends(get_session_factory)],
+    background_tasks: BackgroundTasks,
     game_id: int
 ):
     if current_user.backlog is None:
@@ -105,12 +197,14 @@ async def add_game_to_backlog(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="The game has already been added to the backlog"
         )
-    backlog = await update_backlog(db=db, backlog=current_user.backlog, game=game)
+    db_backlog = await get_backlog(db=db, backlog_id=current_user.backlog.id)
+    backlog = await update_backlog(db=db, backlog=db_backlog, game=game)
+    background_tasks.add_task(_rebalance_in_background, session_factory, backlog.id)
     return backlog
 
 @backlog_router.put("/remove_game", response_model=BacklogOut)
 async def remove_game_from_backlog(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     game_id: int
 ):
@@ -131,6 +225,119 @@ async def remove_game_from_backlog(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="This game is not in the backlog"
         )
-    backlog = await clear_backlog(db=db, backlog=current_user.backlog, game=game)
+    db_backlog = await get_backlog(db=db, backlog_id=current_user.backlog.id)
+    backlog = await clear_backlog(db=db, backlog=db_backlog, game=game)
     return backlog
-    
\ No newline at end of file
+    
+
+@backlog_router.put("/games", response_model=BacklogGamesDiff)
+async def add_games_to_backlog(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)],
+    session_factory: Annotated[sessionmaker, Depends(get_session_factory)],
+    background_tasks: BackgroundTasks,
+    game_ids: Annotated[list[int], Body()]
+):
+    if current_user.backlog is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User has no backlog"
+        )
+    try:
+        diff = await link_backlog_games(db=db, backlog_id=current_user.backlog.id, game_ids=game_ids)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    background_tasks.add_task(_rebalance_in_background, session_factory, current_user.backlog.id)
+    return diff
+
+@backlog_router.put("/remove_games", response_model=BacklogGamesDiff)
+async def remove_games_from_backlog(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)],
+    game_ids: Annotated[list[int], Body()]
+):
+    if current_user.backlog is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User has no backlog"
+        )
+    try:
+        return await unlink_backlog_games(db=db, backlog_id=current_user.backlog.id, game_ids=game_ids)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+@backlog_router.put("/complete_game", response_model=GameCompletion)
+async def complete_game_from_backlog(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)],
+    game_id: int
+):
+    if current_user.backlog is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User has no backlog"
+        )
+    if current_user.complete_game is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User has no completegame"
+        )
+    try:
+        added = await complete_backlog_game(
+            db=db,
+            backlog_id=current_user.backlog.id,
+            complete_game_id=current_user.complete_game.id,
+            user_id=current_user.id,
+            game_id=game_id
+        )
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except NotInListError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return {
+        "game_id": game_id,
+        "backlog_id": current_user.backlog.id,
+        "complete_game_id": current_user.complete_game.id,
+        "added": added
+    }
+
+@backlog_router.put("/move_game", response_model=BacklogGamePosition)
+async def move_game_in_backlog(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)],
+    session_factory: Annotated[sessionmaker, Depends(get_session_factory)],
+    background_tasks: BackgroundTasks,
+    game_id: int,
+    after_game_id: int | None = None
+):
+    if current_user.backlog is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User has no backlog"
+        )
+    try:
+        position = await move_backlog_game(db=db, backlog_id=current_user.backlog.id, game_id=game_id, after_game_id=after_game_id)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except NotInListError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    background_tasks.add_task(_rebalance_in_background, session_factory, current_user.backlog.id)
+    return position
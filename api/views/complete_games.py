@@ -1,21 +1,29 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response, status
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.schemas import User, CompleteGameOut
+from api.schemas import Principal, Game, CompleteGameOut, CompleteGameHeader, CompleteGameGamesDiff
 from api.crud import (
     create_complete_game, 
     get_complete_game, 
+    get_complete_game_version, 
+    get_complete_game_header,
+    get_complete_game_games,
     get_complete_games, 
     delete_complete_game,
     update_complete_game,
     clear_complete_game,
     is_game_in_complete_game,
-    get_game
+    get_game,
+    link_complete_game_games,
+    unlink_complete_game_games
 )
-from api.utils import get_current_user, get_session
+from api.exceptions import InvalidCursorError, NotFoundError
+from api.filters import GameFilters, GameSort
+from api.pagination import Page, page_params, set_next_cursor
+from api.utils import get_current_user, get_session, version_headers, is_not_modified
 
 
 complete_game_router = APIRouter(
@@ -26,7 +34,7 @@ complete_game_router = APIRouter(
 
 @complete_game_router.post("/", response_model=CompleteGameOut)
 async def new_complete_game(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)]
 ):
     if current_user.complete_game:
@@ -40,26 +48,98 @@ async def new_complete_game(
 
 @complete_game_router.get("/{complete_game_id}", response_model=CompleteGameOut)
 async def complete_game_by_id(
-    current_user: Annotated[User, Depends(get_current_user)],
+    request: Request,
+    response: Response,
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     complete_game_id: int
 ):
+    version = await get_complete_game_version(db=db, complete_game_id=complete_game_id)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="CompleteGame not Found"
+        )
+    etag = f'"complete_game-{complete_game_id}-{version.version}"'
+    headers = version_headers(etag, version.updated_at)
+    if is_not_modified(request, etag, version.updated_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     complete_game = await get_complete_game(db=db, complete_game_id=complete_game_id)
     if complete_game is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="CompleteGame not Found"
         )
+    response.headers.update(headers)
     return complete_game
 
+@complete_game_router.get("/{complete_game_id}/header", response_model=CompleteGameHeader)
+async def complete_game_header(
+    request: Request,
+    response: Response,
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)],
+    complete_game_id: int
+):
+    version = await get_complete_game_version(db=db, complete_game_id=complete_game_id)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="CompleteGame not Found"
+        )
+    etag = f'"complete_game-header-{complete_game_id}-{version.version}"'
+    headers = version_headers(etag, version.updated_at)
+    if is_not_modified(request, etag, version.updated_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    header = await get_complete_game_header(db=db, complete_game_id=complete_game_id)
+    if header is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="CompleteGame not Found"
+        )
+    response.headers.update(headers)
+    return header
+
+@complete_game_router.get("/{complete_game_id}/games", response_model=list[Game])
+async def complete_game_games(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)],
+    response: Response,
+    complete_game_id: int,
+    page: Annotated[Page, Depends(page_params)],
+    filters: Annotated[GameFilters, Depends()],
+    sort: Annotated[GameSort, Depends()]
+):
+    if await get_complete_game_version(db=db, complete_game_id=complete_game_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="CompleteGame not Found"
+        )
+    try:
+        games, next_cursor = await get_complete_game_games(db=db, complete_game_id=complete_game_id, page=page, filters=filters, sort=sort)
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    set_next_cursor(response, next_cursor)
+    return games
+
 @complete_game_router.get("/", response_model=list[CompleteGameOut])
 async def all_complete_games(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
-    skip: int = 0,
-    limit: int = 100
+    response: Response,
+    page: Annotated[Page, Depends(page_params)]
 ):
-    complete_games = await get_complete_games(db=db, skip=skip, limit=limit)
+    try:
+        complete_games, next_cursor = await get_complete_games(db=db, page=page)
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    set_next_cursor(response, next_cursor)
     if complete_games is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -69,7 +149,7 @@ async def all_complete_games(
 
 @complete_game_router.delete("/")
 async def remove_complete_game(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)]
 ):
     if current_user.complete_game is None:
@@ -83,7 +163,7 @@ async def remove_complete_game(
 
 @complete_game_router.put("/", response_model=CompleteGameOut)
 async def add_game_to_complete_game(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     game_id: int
 ):
@@ -104,12 +184,13 @@ async def add_game_to_complete_game(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="The game has already been added to the completegame"
         )
-    complete_game = await update_complete_game(db=db, complete_game=current_user.complete_game, game=game)
+    db_complete_game = await get_complete_game(db=db, complete_game_id=current_user.complete_game.id)
+    complete_game = await update_complete_game(db=db, complete_game=db_complete_game, game=game)
     return complete_game
 
 @complete_game_router.put("/remove_game", response_model=CompleteGameOut)
 async def remove_game_from_complete_game(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     game_id: int
 ):
@@ -130,6 +211,45 @@ async def remove_game_from_complete_game(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="This game is not in the completegame"
         )
-    complete_game = await clear_complete_game(db=db, complete_game=current_user.complete_game, game=game)
+    db_complete_game = await get_complete_game(db=db, complete_game_id=current_user.complete_game.id)
+    complete_game = await clear_complete_game(db=db, complete_game=db_complete_game, game=game)
     return complete_game
-    
\ No newline at end of file
+    
+
+@complete_game_router.put("/games", response_model=CompleteGameGamesDiff)
+async def add_games_to_complete_game(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)],
+    game_ids: Annotated[list[int], Body()]
+):
+    if current_user.complete_game is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User has no completegame"
+        )
+    try:
+        return await link_complete_game_games(db=db, complete_game_id=current_user.complete_game.id, game_ids=game_ids)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+@complete_game_router.put("/remove_games", response_model=CompleteGameGamesDiff)
+async def remove_games_from_complete_game(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)],
+    game_ids: Annotated[list[int], Body()]
+):
+    if current_user.complete_game is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User has no completegame"
+        )
+    try:
+        return await unlink_complete_game_games(db=db, complete_game_id=current_user.complete_game.id, game_ids=game_ids)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
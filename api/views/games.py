@@ -1,25 +1,56 @@
-from typing import Annotated
+import csv
+import io
+import json
+import os
+from itertools import islice
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import ValidationError
+from dotenv import load_dotenv
 
-from api.schemas import GameCreate, User, Game, GameUpdate
+from api.schemas import GameCreate, GameFacets, GameGenresDiff, GameImportRow, GameTitle, Principal, Game, GameUpdate
 from api.crud import (
     create_game, 
-    get_game_by_title, 
+    import_games, 
+    search_games, 
+    stream_games, 
+    get_facets, 
     get_game, 
+    get_game_record, 
+    get_game_version, 
     get_games, 
     delete_game, 
     is_users_game,
     update_game,
     update_genres_for_game,
+    replace_genres_for_game,
+    set_game_image,
     clear_genres_for_game,
     get_genre,
     is_genre_in_game
 )
-from api.utils import get_current_user, get_session
+from api.exceptions import (
+    NotFoundError,
+    NotOwnerError,
+    ConflictError,
+    InvalidCursorError,
+    PayloadTooLargeError,
+    UnsupportedMediaTypeError
+)
+from api.filters import GameFilters, GameSort
+from api.autocomplete import title_index
+from api.images import image_store
+from api.pagination import PAGE_LIMIT, Page, page_params, set_next_cursor
+from api.utils import get_current_user, get_session, validation_detail, version_headers, is_not_modified
+
+
+load_dotenv()
 
+GAME_IMPORT_CHUNK_SIZE = int(os.getenv("GAME_IMPORT_CHUNK_SIZE", 1000))
 
 game_router = APIRouter(
     prefix="/games",
@@ -29,46 +60,165 @@ game_router = APIRouter(
 
 @game_router.post("/", response_model=Game)
 async def new_game(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     game: GameCreate
 ):
-    db_game = await get_game_by_title(db=db, title=game.title)
-    if db_game:
+    if current_user.id != game.user_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="There is already a Game with this title"
+            detail="user_id must be equal to the id of the current user"
         )
-    if current_user.id != game.user_id:
+    try:
+        new_game = await create_game(db=db, game=game)
+    except ConflictError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="user_id must be equal to the id of the current user"
+            detail=str(e)
+        )
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
         )
-    new_game = await create_game(db=db, game=game)
     return new_game
 
+@game_router.post("/import")
+async def import_game_catalog(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)],
+    file: UploadFile,
+    format: Literal["csv", "ndjson"] | None = None
+):
+    if format is None:
+        format = "csv" if (file.filename or "").lower().endswith(".csv") else "ndjson"
+    return StreamingResponse(
+        _import_progress(db=db, file=file, format=format, user_id=current_user.id),
+        media_type="application/x-ndjson"
+    )
+
+def _read_import_rows(file, format: str):
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    if format == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(text, start=1):
+            if line.strip():
+                yield line_number, line
+
+async def _import_progress(db: AsyncSession, file: UploadFile, format: str, user_id: int):
+    """Import the upload chunk by chunk, yielding NDJSON rejects and progress.
+
+    Only one chunk of rows is held in memory, and every chunk is committed
+    on its own.
+    """
+    rows = _read_import_rows(file.file, format)
+    processed = inserted = rejected = 0
+    while chunk := await run_in_threadpool(lambda: list(islice(rows, GAME_IMPORT_CHUNK_SIZE))):
+        valid = []
+        for line_number, raw in chunk:
+            try:
+                row = GameImportRow.parse_obj(raw) if format == "csv" else GameImportRow.parse_raw(raw)
+            except ValidationError as e:
+                rejected += 1
+                yield json.dumps({"line": line_number, "status": "rejected", "detail": validation_detail(e)}) + "\n"
+                continue
+            valid.append((line_number, row))
+        if valid:
+            count, rejects = await import_games(db=db, rows=valid, user_id=user_id)
+            inserted += count
+            rejected += len(rejects)
+            for line_number, detail in rejects:
+                yield json.dumps({"line": line_number, "status": "rejected", "detail": detail}) + "\n"
+        processed += len(chunk)
+        yield json.dumps({"status": "progress", "processed": processed, "inserted": inserted, "rejected": rejected}) + "\n"
+    yield json.dumps({"status": "done", "processed": processed, "inserted": inserted, "rejected": rejected}) + "\n"
+
+@game_router.get("/search", response_model=list[Game])
+async def find_games(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)],
+    q: Annotated[str, Query(min_length=1)],
+    limit: Annotated[int, Query(ge=1, le=PAGE_LIMIT)] = 20
+):
+    return await search_games(db=db, q=q, limit=limit)
+
+@game_router.get("/export")
+async def export_games(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)],
+    filters: Annotated[GameFilters, Depends()]
+):
+    return StreamingResponse(_export_lines(db=db, filters=filters), media_type="application/x-ndjson")
+
+async def _export_lines(db: AsyncSession, filters: GameFilters):
+    async for rows in stream_games(db=db, filters=filters):
+        yield "".join(
+            json.dumps({**row, "date_release": row["date_release"].isoformat(), "genres": row["genres"] or []}) + "\n"
+            for row in rows
+        )
+
+@game_router.get("/autocomplete", response_model=list[GameTitle])
+async def autocomplete_games(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    prefix: Annotated[str, Query(min_length=1)],
+    limit: Annotated[int, Query(ge=1, le=PAGE_LIMIT)] = 10
+):
+    return title_index.complete(prefix, limit)
+
+@game_router.get("/facets", response_model=GameFacets)
+async def game_facets(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)]
+):
+    return await get_facets(db=db)
+
 @game_router.get("/{game_id}", response_model=Game)
 async def game_by_id(
-    current_user: Annotated[User, Depends(get_current_user)],
+    request: Request,
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     game_id: int
 ):
-    game = await get_game(db=db, game_id=game_id)
-    if game is None:
+    version = await get_game_version(db=db, game_id=game_id)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Game not Found"
+        )
+    etag = f'"game-{game_id}-{version.version}"'
+    headers = version_headers(etag, version.updated_at)
+    if is_not_modified(request, etag, version.updated_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    loaded = await get_game_record(db=db, game_id=game_id, version=version)
+    if loaded is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Game not Found"
         )
-    return game
+    record, version = loaded
+    headers = version_headers(f'"game-{game_id}-{version.version}"', version.updated_at)
+    return Response(content=record, media_type="application/json", headers=headers)
 
 @game_router.get("/", response_model=list[Game])
 async def all_games(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
-    skip: int = 0,
-    limit: int = 100
+    response: Response,
+    page: Annotated[Page, Depends(page_params)],
+    filters: Annotated[GameFilters, Depends()],
+    sort: Annotated[GameSort, Depends()]
 ):
-    games = await get_games(db=db, skip=skip, limit=limit)
+    try:
+        games, next_cursor = await get_games(db=db, page=page, filters=filters, sort=sort)
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    set_next_cursor(response, next_cursor)
     if games is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -78,7 +228,7 @@ async def all_games(
 
 @game_router.delete("/{game_id}")
 async def remove_game(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     game_id: int
 ):
@@ -95,10 +245,52 @@ async def remove_game(
 
 @game_router.put("/{game_id}", response_model=Game)
 async def change_data_game(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     game_id: int,
     new_game: GameUpdate
+):
+    try:
+        new_game = await update_game(db=db, game_id=game_id, user_id=current_user.id, new_game=new_game)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except (NotOwnerError, ConflictError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return new_game
+
+@game_router.put("/{game_id}/genres", response_model=GameGenresDiff)
+async def replace_genres_of_game(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)],
+    game_id: int,
+    genre_ids: Annotated[list[int], Body()]
+):
+    try:
+        diff = await replace_genres_for_game(db=db, game_id=game_id, user_id=current_user.id, genre_ids=genre_ids)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except NotOwnerError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return diff
+
+@game_router.put("/{game_id}/image", response_model=Game)
+async def upload_game_image(
+    request: Request,
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)],
+    game_id: int
 ):
     db_game = await get_game(db=db, game_id=game_id)
     if db_game is None:
@@ -106,24 +298,36 @@ async def change_data_game(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Game not Found"
         )
-    db_game = await is_users_game(db=db, game_id=game_id, user_id=current_user.id)
-    if db_game is None:
+    if db_game.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="The game does not belong to this user"
         )
-    is_game_title = await get_game_by_title(db=db, title=new_game.title)
-    if is_game_title:
+    # Do not hold the transaction open while the body streams in.
+    await db.commit()
+    try:
+        digest = await image_store.save(request.stream())
+    except PayloadTooLargeError as e:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="There is already a Game with this title"
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
         )
-    new_game = await update_game(db=db, game=db_game, new_game=new_game)
-    return new_game
+    except UnsupportedMediaTypeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(e)
+        )
+    db_game = await get_game(db=db, game_id=game_id)
+    if db_game is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Game not Found"
+        )
+    return await set_game_image(db=db, game=db_game, image=digest)
 
 @game_router.patch("/{game_id}", response_model=Game)
 async def add_genre_to_game(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     game_id: int,
     genre_id: int
@@ -157,7 +361,7 @@ async def add_genre_to_game(
 
 @game_router.patch("/{game_id}/{genre_id}", response_model=Game)
 async def remove_genre_from_game(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     game_id: int,
     genre_id: int
@@ -1,20 +1,23 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.schemas import GenreCreate, User, Genre, GenreUpdate
+from api.schemas import GenreCreate, Principal, Genre, GenreUpdate
 from api.crud import (
     create_genre, 
-    get_genre, 
+    get_genre_record, 
+    get_genre_version, 
     get_genres, 
     delete_genre, 
     get_genre_by_title, 
     is_users_genre,
     update_genre
 )
-from api.utils import get_current_user, get_session
+from api.exceptions import NotFoundError, NotOwnerError, ConflictError, InvalidCursorError
+from api.pagination import Page, page_params, set_next_cursor
+from api.utils import get_current_user, get_session, version_headers, is_not_modified
 
 
 genre_router = APIRouter(
@@ -25,7 +28,7 @@ genre_router = APIRouter(
 
 @genre_router.post("/", response_model=Genre)
 async def new_genre(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     genre: GenreCreate
 ):
@@ -45,26 +48,46 @@ async def new_genre(
 
 @genre_router.get("/{genre_id}", response_model=Genre)
 async def genre_by_id(
-    current_user: Annotated[User, Depends(get_current_user)],
+    request: Request,
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     genre_id: int
 ):
-    genre = await get_genre(db=db, genre_id=genre_id)
-    if genre is None:
+    version = await get_genre_version(db=db, genre_id=genre_id)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Genre not Found"
+        )
+    etag = f'"genre-{genre_id}-{version.version}"'
+    headers = version_headers(etag, version.updated_at)
+    if is_not_modified(request, etag, version.updated_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    loaded = await get_genre_record(db=db, genre_id=genre_id, version=version)
+    if loaded is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Genre not Found"
         )
-    return genre
+    record, version = loaded
+    headers = version_headers(f'"genre-{genre_id}-{version.version}"', version.updated_at)
+    return Response(content=record, media_type="application/json", headers=headers)
 
 @genre_router.get("/", response_model=list[Genre])
 async def all_genres(
-    currnet_user: Annotated[User, Depends(get_current_user)],
+    currnet_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
-    skip: int = 0,
-    limit: int = 100
+    response: Response,
+    page: Annotated[Page, Depends(page_params)]
 ):
-    genres = await get_genres(db=db, skip=skip, limit=limit)
+    try:
+        genres, next_cursor = await get_genres(db=db, page=page)
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    set_next_cursor(response, next_cursor)
     if genres is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -74,7 +97,7 @@ async def all_genres(
 
 @genre_router.delete("/{genre_id}")
 async def remove_genre(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     genre_id: int
 ):
@@ -91,22 +114,21 @@ async def remove_genre(
 
 @genre_router.put("/{genre_id}", response_model=Genre)
 async def change_title_for_genre(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     genre_id: int,
     genre: GenreUpdate
 ):
-    db_genre = await get_genre(db=db, genre_id=genre_id)
-    if db_genre is None:
+    try:
+        new_genre = await update_genre(db=db, genre_id=genre_id, user_id=current_user.id, new_genre=genre)
+    except NotFoundError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Genre not Found"
+            detail=str(e)
         )
-    db_genre = await is_users_genre(db=db, genre_id=genre_id, user_id=current_user.id)
-    if db_genre is None:
+    except (NotOwnerError, ConflictError) as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Genre does not belong to this user"
+            detail=str(e)
         )
-    new_genre = await update_genre(db=db, genre=db_genre, new_genre=genre)
-    return new_genre
+    return new_genre
\ No newline at end of file
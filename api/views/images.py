@@ -0,0 +1,48 @@
+from fastapi import APIRouter, HTTPException, Request, Response, status
+
+from api.images import FileRangeResponse, image_store, parse_range
+from api.utils import etag_matches
+
+
+image_router = APIRouter(
+    prefix="/images",
+    tags=["images"],
+    responses={404: {"description": "Not Found"}}
+)
+
+@image_router.get("/{digest}")
+async def read_image(request: Request, digest: str):
+    image = await image_store.open(digest)
+    if image is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not Found"
+        )
+    path, stat_result, media_type = image
+    headers = {
+        "ETag": f'"{digest}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    size = stat_result.st_size
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "Content-Range": f"bytes */{size}"}
+        )
+    if byte_range is None:
+        return FileRangeResponse(path, 0, size - 1, headers=headers, media_type=media_type, stat_result=stat_result)
+    start, end = byte_range
+    return FileRangeResponse(
+        path,
+        start,
+        end,
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}"},
+        media_type=media_type,
+        stat_result=stat_result
+    )
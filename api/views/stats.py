@@ -0,0 +1,31 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+
+from api.schemas import Principal
+from api.cache import principal_cache, revoked_token_versions, game_cache, genre_cache
+from api.autocomplete import title_index
+from api.hashing import password_hasher
+from api.throttling import login_throttle
+from api.utils import get_current_user
+
+
+stats_router = APIRouter(
+    prefix="/stats",
+    tags=["stats"],
+    responses={404: {"description": "Not Found"}}
+)
+
+@stats_router.get("/")
+async def service_stats(
+    current_user: Annotated[Principal, Depends(get_current_user)]
+):
+    return {
+        "principal_cache": principal_cache.stats(),
+        "revoked_token_versions": revoked_token_versions.stats(),
+        "password_hasher": password_hasher.stats(),
+        "login_throttle": login_throttle.stats(),
+        "game_cache": game_cache.stats(),
+        "genre_cache": genre_cache.stats(),
+        "title_index": title_index.stats()
+    }
@@ -1,17 +1,35 @@
+import asyncio
 import os
 from datetime import timedelta
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import ValidationError
 from dotenv import load_dotenv
 
-from api.schemas import Token, User, UserCreate, UserUpdate
+from api.schemas import Token, User, UserSummary, Principal, UserCreate, UserUpdate, BulkUserResult
 from api.database import get_session
-from api.utils import authenticate_user, create_access_token, get_current_user
-from api.crud import get_user_by_name, create_user, get_users, delete_user, update_user
+from api.hashing import get_password_hash
+from api.exceptions import NotFoundError, ConflictError, InvalidCursorError
+from api.pagination import Page, page_params, set_next_cursor
+from api.throttling import login_throttle
+from api.utils import authenticate_user, create_access_token, get_current_user, etag_matches, ndjson_lines, validation_detail
+from api.crud import (
+    get_user_by_name, 
+    get_user, 
+    create_user, 
+    get_users, 
+    delete_user, 
+    update_user, 
+    revoke_user_tokens, 
+    get_profile_version,
+    get_user_credentials,
+    get_existing_usernames,
+    create_users
+)
 
 
 load_dotenv()
@@ -19,6 +37,7 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+BULK_REGISTER_BATCH_SIZE = 500
 
 user_router = APIRouter(
     prefix="/users",
@@ -28,9 +47,12 @@ user_router = APIRouter(
 
 @user_router.post("/token", response_model=Token)
 async def login_for_access_token(
+    request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     db: AsyncSession = Depends(get_session)
 ):
+    client = request.client.host if request.client else None
+    await login_throttle.check(db, username=form_data.username, client=client)
     user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
@@ -40,13 +62,13 @@ async def login_for_access_token(
         )
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": str(user.id), "ver": user.token_version}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 @user_router.post("/register", response_model=User)
 async def create_new_user(user: UserCreate, db: AsyncSession = Depends(get_session)):
-    db_user = await get_user_by_name(db=db, username=user.username)
+    db_user = await get_user_credentials(db=db, username=user.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -55,27 +77,102 @@ async def create_new_user(user: UserCreate, db: AsyncSession = Depends(get_sessi
     new_user = await create_user(db=db, user=user)
     return new_user
 
+@user_router.post("/bulk_register", response_model=list[BulkUserResult])
+async def bulk_register_users(
+    request: Request,
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)]
+):
+    results = []
+    batch = []
+    async for line_number, line in ndjson_lines(request.stream()):
+        try:
+            user = UserCreate.parse_raw(line)
+        except ValidationError as e:
+            results.append(BulkUserResult(line=line_number, status="invalid", detail=validation_detail(e)))
+            continue
+        batch.append((line_number, user))
+        if len(batch) == BULK_REGISTER_BATCH_SIZE:
+            results.extend(await _register_batch(db=db, batch=batch))
+            batch = []
+    if batch:
+        results.extend(await _register_batch(db=db, batch=batch))
+    return sorted(results, key=lambda result: result.line)
+
+async def _register_batch(db: AsyncSession, batch: list[tuple[int, UserCreate]]):
+    results = []
+    pending = []
+    taken = await get_existing_usernames(db=db, usernames=[user.username for _, user in batch])
+    for line_number, user in batch:
+        if user.username in taken:
+            results.append(BulkUserResult(line=line_number, status="conflict", username=user.username, detail="Username is already exists"))
+            continue
+        taken.add(user.username)
+        pending.append((line_number, user))
+    if not pending:
+        return results
+    hashed_passwords = await asyncio.gather(*(get_password_hash(user.password) for _, user in pending))
+    created = await create_users(
+        db=db,
+        users=[
+            {"username": user.username, "hashed_password": hashed_password}
+            for (_, user), hashed_password in zip(pending, hashed_passwords)
+        ]
+    )
+    for line_number, user in pending:
+        user_id = created.get(user.username)
+        if user_id is None:
+            results.append(BulkUserResult(line=line_number, status="conflict", username=user.username, detail="Username is already exists"))
+        else:
+            results.append(BulkUserResult(line=line_number, status="created", username=user.username, id=user_id))
+    return results
+
+@user_router.post("/logout")
+async def user_logout(
+    current_user: Annotated[Principal, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_session)]
+):
+    await revoke_user_tokens(db=db, user_id=current_user.id)
+    data = {"message": "All tokens have been revoked"}
+    return JSONResponse(content=data, status_code=status.HTTP_200_OK)
+
 @user_router.get("/me", response_model=User)
 async def read_users_me(
-    current_user: Annotated[User, Depends(get_current_user)],
+    request: Request,
+    response: Response,
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)]
-):  
-    user = await get_user_by_name(db=db, username=current_user.username)
-    return user
+):
+    profile_version = await get_profile_version(db=db, user_id=current_user.id)
+    etag = f'"{current_user.id}-{profile_version}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    user = await get_user(db=db, user_id=current_user.id)
+    response.headers.update(headers)
+    return User.from_orm(user)
 
-@user_router.get("/", response_model=list[User])
+@user_router.get("/", response_model=list[UserSummary])
 async def read_users(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
-    skip: int = 0,
-    limit: int = 100
+    response: Response,
+    page: Annotated[Page, Depends(page_params)]
 ):
-    return await get_users(db=db, skip=skip, limit=limit)
+    try:
+        users, next_cursor = await get_users(db=db, page=page)
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    set_next_cursor(response, next_cursor)
+    return users
 
 @user_router.get("/{username}", response_model=User)
 async def read_user(
     username: str,
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)]
 ):
     user = await get_user_by_name(db=db, username=username)
@@ -84,11 +181,11 @@ async def read_user(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not Found"
         )
-    return user
+    return User.from_orm(user)
 
 @user_router.delete("/me")
 async def user_delete(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)]
 ):
     await delete_user(db=db, username=current_user.username)
@@ -97,15 +194,21 @@ async def user_delete(
 
 @user_router.put("/me", response_model=User)
 async def user_change_username(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_session)],
     user: UserUpdate
 ):
-    user_db = await get_user_by_name(db=db, username=user.username)
-    if user_db:
+    try:
+        await update_user(db=db, user_id=current_user.id, new_user=user)
+    except ConflictError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username is already exists"
+            detail=str(e)
+        )
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
         )
-    user = await update_user(db=db, user=current_user, new_user=user)
-    return user
\ No newline at end of file
+    user = await get_user(db=db, user_id=current_user.id)
+    return User.from_orm(user)
\ No newline at end of file
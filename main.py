@@ -1,7 +1,13 @@
+import asyncio
+
 import uvicorn
 from fastapi import FastAPI
 
-from api.views import user_router, backlog_router, complete_game_router, genre_router, game_router
+from api.autocomplete import title_index
+from api.crud import get_game_titles
+from api.database import async_session
+from api.hashing import password_hasher
+from api.views import user_router, backlog_router, complete_game_router, genre_router, game_router, stats_router, image_router
 
 
 app = FastAPI()
@@ -11,6 +17,29 @@ app.include_router(backlog_router)
 app.include_router(complete_game_router)
 app.include_router(genre_router)
 app.include_router(game_router)
+app.include_router(stats_router)
+app.include_router(image_router)
+
+
+async def fetch_game_titles():
+    async with async_session() as db:
+        return await get_game_titles(db=db)
+
+
+@app.on_event("startup")
+async def load_title_index():
+    await title_index.refresh(fetch_game_titles)
+    app.state.title_index_task = asyncio.create_task(title_index.run(fetch_game_titles))
+
+
+@app.on_event("shutdown")
+def stop_title_index():
+    app.state.title_index_task.cancel()
+
+
+@app.on_event("shutdown")
+def shutdown_password_hasher():
+    password_hasher.shutdown()
 
 
 
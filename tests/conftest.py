@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 from typing import AsyncGenerator, Generator, Callable
 
 import asyncio
@@ -49,11 +50,32 @@ def override_get_db(get_session: AsyncSession) -> Callable:
 
 
 @pytest_asyncio.fixture()
-def app(override_get_db: Callable) -> FastAPI:
-    from api.database import get_session
+def override_get_session_factory(get_session: AsyncSession) -> Callable:
+    @asynccontextmanager
+    async def _session():
+        yield get_session
+
+    return lambda: _session
+
+
+@pytest_asyncio.fixture()
+def app(override_get_db: Callable, override_get_session_factory: Callable, tmp_path) -> FastAPI:
+    from api.database import get_session, get_session_factory
+    from api.autocomplete import title_index
+    from api.cache import principal_cache, revoked_token_versions, game_cache, genre_cache
+    from api.images import image_store
+    from api.throttling import login_throttle
     from main import app
 
     app.dependency_overrides[get_session] = override_get_db
+    app.dependency_overrides[get_session_factory] = override_get_session_factory
+    principal_cache.clear()
+    revoked_token_versions.clear()
+    game_cache.clear()
+    genre_cache.clear()
+    title_index.clear()
+    login_throttle.clear()
+    image_store.root = str(tmp_path / "images")
     return app
 
 
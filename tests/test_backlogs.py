@@ -76,6 +76,49 @@ async def test_get_backlog(async_client):
     assert response.json() == test_answer
 
 
+async def test_get_backlog_not_modified(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": []
+    }
+    test_new_game_data_payload = {
+        "title": "new_game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27"
+    }
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/backlogs/", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.get("/backlogs/1", headers={"Authorization": f"Bearer {token}"})
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+    response = await async_client.get("/backlogs/1", headers={"Authorization": f"Bearer {token}", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    response = await async_client.get("/backlogs/1", headers={"Authorization": f"Bearer {token}", "If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+    response = await async_client.put("/backlogs/?game_id=1", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.get("/backlogs/1", headers={"Authorization": f"Bearer {token}", "If-None-Match": etag})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    response = await async_client.put("/games/1", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_new_game_data_payload))
+    response = await async_client.get("/backlogs/1", headers={"Authorization": f"Bearer {token}", "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["games"][0]["title"] == "new_game"
+
+
 async def test_get_backlog_incorrect(async_client):
     test_answer = {"detail": "Could not validate credentials"}
     token = "qwerty"
@@ -335,4 +378,349 @@ async def test_remove_backlog_400_backlog(async_client):
     token = token["access_token"]
     response = await async_client.delete("/backlogs/", headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 400
-    assert response.json() == test_answer
\ No newline at end of file
+    assert response.json() == test_answer
+
+
+async def test_add_games_to_backlog(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/backlogs/", headers={"Authorization": f"Bearer {token}"})
+    for title in ["first", "second", "third"]:
+        test_game_payload = {
+            "title": title,
+            "developer": "developer",
+            "publisher": "publisher",
+            "date_release": "2023-06-27",
+            "image": "string",
+            "user_id": 1,
+            "genres": []
+        }
+        response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.put("/backlogs/", headers={"Authorization": f"Bearer {token}"}, params={"game_id": 2})
+    response = await async_client.put("/backlogs/games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([3, 1, 2, 1]))
+    assert response.status_code == 200
+    assert response.json() == {"backlog_id": 1, "added": [1, 3], "removed": []}
+    response = await async_client.get("/backlogs/1", headers={"Authorization": f"Bearer {token}"})
+    assert sorted(game["id"] for game in response.json()["games"]) == [1, 2, 3]
+
+    response = await async_client.put("/backlogs/remove_games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([1, 3, 4]))
+    assert response.status_code == 200
+    assert response.json() == {"backlog_id": 1, "added": [], "removed": [1, 3]}
+    response = await async_client.get("/backlogs/1", headers={"Authorization": f"Bearer {token}"})
+    assert [game["id"] for game in response.json()["games"]] == [2]
+
+
+async def test_add_games_to_backlog_404_game(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": []
+    }
+    test_answer = {"detail": "Games not Found: 2, 3"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/backlogs/", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.put("/backlogs/games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([1, 2, 3]))
+    assert response.status_code == 404
+    assert response.json() == test_answer
+    response = await async_client.get("/backlogs/1", headers={"Authorization": f"Bearer {token}"})
+    assert response.json()["games"] == []
+
+
+async def test_add_games_to_backlog_400_backlog(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_answer = {"detail": "User has no backlog"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.put("/backlogs/games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([1]))
+    assert response.status_code == 400
+    assert response.json() == test_answer
+
+
+async def test_complete_game_from_backlog(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": []
+    }
+    test_answer = {"game_id": 1, "backlog_id": 1, "complete_game_id": 1, "added": True}
+    test_not_in_backlog_answer = {"detail": "This game is not in the backlog"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/backlogs/", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.post("/complete_games/", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.put("/backlogs/", headers={"Authorization": f"Bearer {token}"}, params={"game_id": 1})
+    response = await async_client.get("/complete_games/1", headers={"Authorization": f"Bearer {token}"})
+    etag = response.headers["ETag"]
+    response = await async_client.put("/backlogs/complete_game", headers={"Authorization": f"Bearer {token}"}, params={"game_id": 1})
+    assert response.status_code == 200
+    assert response.json() == test_answer
+    response = await async_client.get("/backlogs/1", headers={"Authorization": f"Bearer {token}"})
+    assert response.json()["games"] == []
+    response = await async_client.get("/complete_games/1", headers={"Authorization": f"Bearer {token}", "If-None-Match": etag})
+    assert response.status_code == 200
+    assert [game["id"] for game in response.json()["games"]] == [1]
+
+    response = await async_client.put("/backlogs/complete_game", headers={"Authorization": f"Bearer {token}"}, params={"game_id": 1})
+    assert response.status_code == 400
+    assert response.json() == test_not_in_backlog_answer
+
+
+async def test_complete_game_from_backlog_404_complete_game(async_client, get_session):
+    from sqlalchemy import delete
+    from api.models import CompleteGame
+
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": []
+    }
+    test_answer = {"detail": "CompleteGame not Found"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/backlogs/", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.post("/complete_games/", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.put("/backlogs/", headers={"Authorization": f"Bearer {token}"}, params={"game_id": 1})
+    # Deleted behind the cached principal's back, as by another worker.
+    await get_session.execute(delete(CompleteGame.__table__))
+    await get_session.commit()
+    response = await async_client.put("/backlogs/complete_game", headers={"Authorization": f"Bearer {token}"}, params={"game_id": 1})
+    assert response.status_code == 404
+    assert response.json() == test_answer
+    response = await async_client.get("/backlogs/1", headers={"Authorization": f"Bearer {token}"})
+    assert [game["id"] for game in response.json()["games"]] == [1]
+
+
+async def test_complete_game_from_backlog_400_complete_game(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_answer = {"detail": "User has no completegame"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/backlogs/", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.put("/backlogs/complete_game", headers={"Authorization": f"Bearer {token}"}, params={"game_id": 1})
+    assert response.status_code == 400
+    assert response.json() == test_answer
+
+
+async def test_move_game_in_backlog(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_not_in_backlog_answer = {"detail": "The game to move after is not in the backlog"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/backlogs/", headers={"Authorization": f"Bearer {token}"})
+    for title in ["first", "second", "third", "fourth"]:
+        test_game_payload = {
+            "title": title,
+            "developer": "developer",
+            "publisher": "publisher",
+            "date_release": "2023-06-27",
+            "image": "string",
+            "user_id": 1,
+            "genres": []
+        }
+        response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.put("/backlogs/games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([3, 1, 2]))
+    response = await async_client.put("/backlogs/", headers={"Authorization": f"Bearer {token}"}, params={"game_id": 4})
+    assert [game["id"] for game in response.json()["games"]] == [3, 1, 2, 4]
+
+    response = await async_client.put("/backlogs/move_game", headers={"Authorization": f"Bearer {token}"}, params={"game_id": 2})
+    assert response.status_code == 200
+    assert response.json()["game_id"] == 2
+    response = await async_client.put("/backlogs/move_game", headers={"Authorization": f"Bearer {token}"}, params={"game_id": 3, "after_game_id": 1})
+    response = await async_client.put("/backlogs/move_game", headers={"Authorization": f"Bearer {token}"}, params={"game_id": 4, "after_game_id": 2})
+    response = await async_client.get("/backlogs/1", headers={"Authorization": f"Bearer {token}"})
+    assert [game["id"] for game in response.json()["games"]] == [2, 4, 1, 3]
+
+    response = await async_client.put("/backlogs/move_game", headers={"Authorization": f"Bearer {token}"}, params={"game_id": 4, "after_game_id": 5})
+    assert response.status_code == 400
+    assert response.json() == test_not_in_backlog_answer
+
+
+async def test_move_game_in_backlog_rebalances(async_client, get_session, monkeypatch):
+    from sqlalchemy import select, func
+    from api.models import backlog_game
+
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    monkeypatch.setattr("api.crud.backlogs.RANK_MAX_LENGTH", 7)
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/backlogs/", headers={"Authorization": f"Bearer {token}"})
+    for title in ["first", "second", "third"]:
+        test_game_payload = {
+            "title": title,
+            "developer": "developer",
+            "publisher": "publisher",
+            "date_release": "2023-06-27",
+            "image": "string",
+            "user_id": 1,
+            "genres": []
+        }
+        response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.put("/backlogs/games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([1, 2, 3]))
+    for _ in range(30):
+        response = await async_client.put("/backlogs/move_game", headers={"Authorization": f"Bearer {token}"}, params={"game_id": 3, "after_game_id": 1})
+        response = await async_client.put("/backlogs/move_game", headers={"Authorization": f"Bearer {token}"}, params={"game_id": 2, "after_game_id": 1})
+    result = await get_session.execute(select(func.max(func.length(backlog_game.c.position))))
+    assert result.scalar() <= 7
+    response = await async_client.get("/backlogs/1", headers={"Authorization": f"Bearer {token}"})
+    assert [game["id"] for game in response.json()["games"]] == [1, 2, 3]
+
+
+async def test_backlog_ranks_leave_room_after_respread():
+    from api.ranks import RANK_WIDTH, rank_after, rank_before, spread_ranks
+
+    ranks = spread_ranks(5000)
+    assert ranks == sorted(ranks)
+    assert max(len(rank) for rank in ranks) <= RANK_WIDTH
+    last, first = ranks[-1], ranks[0]
+    for _ in range(5000):
+        last, first = rank_after(last), rank_before(first)
+    assert len(last) <= RANK_WIDTH
+    assert len(first) <= RANK_WIDTH
+
+
+async def test_get_backlog_games(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_404_answer = {"detail": "Backlog not Found"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/backlogs/", headers={"Authorization": f"Bearer {token}"})
+    for title, publisher in [("first", "publisher"), ("second", "other"), ("third", "publisher"), ("fourth", "publisher")]:
+        test_game_payload = {
+            "title": title,
+            "developer": "developer",
+            "publisher": publisher,
+            "date_release": "2023-06-27",
+            "image": "string",
+            "user_id": 1,
+            "genres": []
+        }
+        response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.put("/backlogs/games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([3, 1, 2, 4]))
+
+    response = await async_client.get("/backlogs/1/header", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json() == {"id": 1, "user_id": 1, "game_count": 4}
+
+    response = await async_client.get("/backlogs/1/games", headers={"Authorization": f"Bearer {token}"}, params={"limit": 3})
+    assert response.status_code == 200
+    assert [game["id"] for game in response.json()] == [3, 1, 2]
+    cursor = response.headers["X-Next-Cursor"]
+    response = await async_client.get("/backlogs/1/games", headers={"Authorization": f"Bearer {token}"}, params={"limit": 3, "cursor": cursor})
+    assert [game["id"] for game in response.json()] == [4]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = await async_client.get("/backlogs/1/games", headers={"Authorization": f"Bearer {token}"}, params={"publisher": "publisher", "sort": "title", "order": "desc"})
+    assert [game["title"] for game in response.json()] == ["third", "fourth", "first"]
+
+    response = await async_client.get("/backlogs/2/games", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 404
+    assert response.json() == test_404_answer
+    response = await async_client.get("/backlogs/2/header", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 404
+    assert response.json() == test_404_answer
+
+
+async def test_add_and_remove_many_games_backlogs(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": []
+    }
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/backlogs/", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    game_ids = list(range(1, 40001))
+    response = await async_client.put("/backlogs/games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(game_ids))
+    assert response.status_code == 404
+    response = await async_client.put("/backlogs/games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([1]))
+    response = await async_client.put("/backlogs/remove_games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(game_ids))
+    assert response.status_code == 200
+    assert response.json() == {"backlog_id": 1, "added": [], "removed": [1]}
+
+
+async def test_get_backlog_games_cursor_survives_rebalance(async_client, get_session, monkeypatch):
+    from api.crud import rebalance_backlog
+
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/backlogs/", headers={"Authorization": f"Bearer {token}"})
+    for title in ["first", "second", "third", "fourth"]:
+        test_game_payload = {
+            "title": title,
+            "developer": "developer",
+            "publisher": "publisher",
+            "date_release": "2023-06-27",
+            "image": "string",
+            "user_id": 1,
+            "genres": []
+        }
+        response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.put("/backlogs/games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([3, 1, 2, 4]))
+    response = await async_client.get("/backlogs/1/games", headers={"Authorization": f"Bearer {token}"}, params={"limit": 1})
+    assert [game["id"] for game in response.json()] == [3]
+    cursor = response.headers["X-Next-Cursor"]
+
+    monkeypatch.setattr("api.crud.backlogs.RANK_MAX_LENGTH", 0)
+    assert await rebalance_backlog(db=get_session, backlog_id=1)
+    response = await async_client.get("/backlogs/1/games", headers={"Authorization": f"Bearer {token}"}, params={"limit": 2, "cursor": cursor})
+    assert [game["id"] for game in response.json()] == [1, 2]
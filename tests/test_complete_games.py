@@ -335,4 +335,140 @@ async def test_remove_complete_game_400_complete_game(async_client):
     token = token["access_token"]
     response = await async_client.delete("/complete_games/", headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 400
-    assert response.json() == test_answer
\ No newline at end of file
+    assert response.json() == test_answer
+
+
+async def test_add_games_to_complete_game(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/complete_games/", headers={"Authorization": f"Bearer {token}"})
+    for title in ["first", "second", "third"]:
+        test_game_payload = {
+            "title": title,
+            "developer": "developer",
+            "publisher": "publisher",
+            "date_release": "2023-06-27",
+            "image": "string",
+            "user_id": 1,
+            "genres": []
+        }
+        response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.put("/complete_games/", headers={"Authorization": f"Bearer {token}"}, params={"game_id": 2})
+    response = await async_client.put("/complete_games/games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([3, 1, 2, 1]))
+    assert response.status_code == 200
+    assert response.json() == {"complete_game_id": 1, "added": [1, 3], "removed": []}
+    response = await async_client.get("/complete_games/1", headers={"Authorization": f"Bearer {token}"})
+    assert sorted(game["id"] for game in response.json()["games"]) == [1, 2, 3]
+
+    response = await async_client.put("/complete_games/remove_games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([1, 3, 4]))
+    assert response.status_code == 200
+    assert response.json() == {"complete_game_id": 1, "added": [], "removed": [1, 3]}
+    response = await async_client.get("/complete_games/1", headers={"Authorization": f"Bearer {token}"})
+    assert [game["id"] for game in response.json()["games"]] == [2]
+
+
+async def test_add_games_to_complete_game_404_game(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": []
+    }
+    test_answer = {"detail": "Games not Found: 2, 3"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/complete_games/", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.put("/complete_games/games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([1, 2, 3]))
+    assert response.status_code == 404
+    assert response.json() == test_answer
+    response = await async_client.get("/complete_games/1", headers={"Authorization": f"Bearer {token}"})
+    assert response.json()["games"] == []
+
+
+async def test_add_games_to_complete_game_400_complete_game(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_answer = {"detail": "User has no completegame"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.put("/complete_games/games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([1]))
+    assert response.status_code == 400
+    assert response.json() == test_answer
+
+
+async def test_get_complete_game_games(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/complete_games/", headers={"Authorization": f"Bearer {token}"})
+    for title in ["first", "second", "third"]:
+        test_game_payload = {
+            "title": title,
+            "developer": "developer",
+            "publisher": "publisher",
+            "date_release": "2023-06-27",
+            "image": "string",
+            "user_id": 1,
+            "genres": []
+        }
+        response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.put("/complete_games/games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([3, 1]))
+
+    response = await async_client.get("/complete_games/1/header", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json() == {"id": 1, "user_id": 1, "game_count": 2}
+    etag = response.headers["ETag"]
+    response = await async_client.get("/complete_games/1/header", headers={"Authorization": f"Bearer {token}", "If-None-Match": etag})
+    assert response.status_code == 304
+
+    response = await async_client.get("/complete_games/1/games", headers={"Authorization": f"Bearer {token}"}, params={"limit": 1})
+    assert response.status_code == 200
+    assert [game["id"] for game in response.json()] == [1]
+    cursor = response.headers["X-Next-Cursor"]
+    response = await async_client.get("/complete_games/1/games", headers={"Authorization": f"Bearer {token}"}, params={"limit": 1, "cursor": cursor})
+    assert [game["id"] for game in response.json()] == [3]
+    assert "X-Next-Cursor" not in response.headers
+
+
+async def test_add_and_remove_many_games_complete_games(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": []
+    }
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/complete_games/", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    game_ids = list(range(1, 40001))
+    response = await async_client.put("/complete_games/games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(game_ids))
+    assert response.status_code == 404
+    response = await async_client.put("/complete_games/games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([1]))
+    response = await async_client.put("/complete_games/remove_games", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(game_ids))
+    assert response.status_code == 200
+    assert response.json() == {"complete_game_id": 1, "added": [], "removed": [1]}
@@ -36,6 +36,65 @@ async def test_new_game(async_client):
     assert response.json() == test_answer
 
 
+async def test_new_game_with_genres(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_genre_payload = {"title": "genre", "user_id": 1}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": [{"id": 1, "title": "genre", "user_id": 1}]
+    }
+    test_answer = {
+        "id": 1,
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": [{"id": 1, "title": "genre", "user_id": 1}]
+    }
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_genre_payload))
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    assert response.status_code == 200
+    assert response.json() == test_answer
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}"})
+    assert response.json() == test_answer
+
+
+async def test_new_game_404_genre(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": [{"id": 5, "title": "genre", "user_id": 1}]
+    }
+    test_answer = {"detail": "Genres not Found: 5"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    assert response.status_code == 404
+    assert response.json() == test_answer
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 404
+
+
 async def test_new_game_incorrect(async_client):
     test_answer = {"detail": "Could not validate credentials"}
     test_game_payload = {
@@ -130,6 +189,83 @@ async def test_get_game(async_client):
     assert response.json() == test_answer
 
 
+async def test_get_game_not_modified(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_genre_payload = {"title": "genre", "user_id": 1}
+    test_new_title_genre = {"title": "new_genre", "user_id": 1}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": []
+    }
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_genre_payload))
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}"})
+    etag = response.headers["ETag"]
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = await async_client.patch("/games/1?genre_id=1", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}", "If-None-Match": etag})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    response = await async_client.put("/genres/1", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_new_title_genre))
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}", "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["genres"] == [{"id": 1, "title": "new_genre", "user_id": 1}]
+
+
+async def test_get_game_headers_match_body(async_client, monkeypatch):
+    from api.crud import get_game_version
+
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": []
+    }
+    test_update_payload = {
+        "title": "new_game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27"
+    }
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}"})
+    old_etag = response.headers["ETag"]
+
+    # The game changes between reading its version and loading it.
+    async def version_then_update(db, game_id):
+        version = await get_game_version(db=db, game_id=game_id)
+        await async_client.put("/games/1", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_update_payload))
+        return version
+
+    monkeypatch.setattr("api.views.games.get_game_version", version_then_update)
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["title"] == "new_game"
+    assert response.headers["ETag"] != old_etag
+
+
 async def test_get_game_incorrect(async_client):
     test_answer = {"detail": "Could not validate credentials"}
     token = "qwerty"
@@ -193,6 +329,46 @@ async def test_get_games(async_client):
     assert response.json() == test_answer
 
 
+async def test_get_games_filtered_and_sorted(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_genre_payload = {"title": "rpg", "user_id": 1}
+    test_games = [
+        ("first", "publisher", "2014-05-01", True),
+        ("second", "publisher", "2016-05-01", True),
+        ("third", "publisher", "2019-05-01", True),
+        ("fourth", "publisher", "2018-05-01", False),
+        ("fifth", "other", "2017-05-01", True),
+    ]
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_genre_payload))
+    for title, publisher, date_release, is_rpg in test_games:
+        test_game_payload = {
+            "title": title,
+            "developer": "developer",
+            "publisher": publisher,
+            "date_release": date_release,
+            "image": "string",
+            "user_id": 1,
+            "genres": [{"id": 1, "title": "rpg", "user_id": 1}] if is_rpg else []
+        }
+        response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    query = "genre_id=1&publisher=publisher&released_from=2015-01-01&released_to=2020-12-31&sort=date_release&order=desc"
+    response = await async_client.get(f"/games/?{query}&limit=1", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert [game["title"] for game in response.json()] == ["third"]
+    cursor = response.headers["X-Next-Cursor"]
+    response = await async_client.get(f"/games/?{query}&limit=1&cursor={cursor}", headers={"Authorization": f"Bearer {token}"})
+    assert [game["title"] for game in response.json()] == ["second"]
+    assert "X-Next-Cursor" not in response.headers
+    response = await async_client.get(f"/games/?sort=id&cursor={cursor}", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
 async def test_get_games_incorrect(async_client):
     test_answer = {"detail": "Could not validate credentials"}
     token = "qwerty"
@@ -201,6 +377,178 @@ async def test_get_games_incorrect(async_client):
     assert response.json() == test_answer
 
 
+async def test_search_games(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_games = [
+        ("The Witcher 3: Wild Hunt", "CD Projekt Red", "CD Projekt"),
+        ("Cyberpunk 2077", "CD Projekt Red", "CD Projekt"),
+        ("Hollow Knight", "Team Cherry", "Team Cherry"),
+    ]
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    for title, developer, publisher in test_games:
+        test_game_payload = {
+            "title": title,
+            "developer": developer,
+            "publisher": publisher,
+            "date_release": "2023-06-27",
+            "image": "string",
+            "user_id": 1,
+            "genres": []
+        }
+        response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.get("/games/search?q=witcher", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert [game["title"] for game in response.json()] == ["The Witcher 3: Wild Hunt"]
+    response = await async_client.get("/games/search?q=witchr", headers={"Authorization": f"Bearer {token}"})
+    assert [game["title"] for game in response.json()] == ["The Witcher 3: Wild Hunt"]
+    response = await async_client.get("/games/search?q=projekt", headers={"Authorization": f"Bearer {token}"})
+    assert sorted(game["title"] for game in response.json()) == ["Cyberpunk 2077", "The Witcher 3: Wild Hunt"]
+    response = await async_client.get("/games/search?q=cyberpunk projekt", headers={"Authorization": f"Bearer {token}"})
+    assert [game["title"] for game in response.json()][0] == "Cyberpunk 2077"
+
+
+async def test_search_games_incorrect(async_client):
+    test_answer = {"detail": "Could not validate credentials"}
+    token = "qwerty"
+    response = await async_client.get("/games/search?q=game", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert response.json() == test_answer
+
+
+async def test_export_games(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_answer = [
+        {
+            "id": 1,
+            "title": "first",
+            "developer": "developer",
+            "publisher": "publisher",
+            "date_release": "2023-06-27",
+            "image": None,
+            "user_id": 1,
+            "genres": ["action", "rpg"]
+        },
+        {
+            "id": 2,
+            "title": "second",
+            "developer": "developer",
+            "publisher": "publisher",
+            "date_release": "2023-06-27",
+            "image": None,
+            "user_id": 1,
+            "genres": []
+        }
+    ]
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    for title in ["rpg", "action"]:
+        test_genre_payload = {"title": title, "user_id": 1}
+        response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_genre_payload))
+    for title, genres in [("first", [{"id": 1, "title": "rpg", "user_id": 1}, {"id": 2, "title": "action", "user_id": 1}]), ("second", [])]:
+        test_game_payload = {
+            "title": title,
+            "developer": "developer",
+            "publisher": "publisher",
+            "date_release": "2023-06-27",
+            "image": None,
+            "user_id": 1,
+            "genres": genres
+        }
+        response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.get("/games/export", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == test_answer
+    response = await async_client.get("/games/export?genre_id=1", headers={"Authorization": f"Bearer {token}"})
+    assert [json.loads(line)["title"] for line in response.text.splitlines()] == ["first"]
+
+
+async def test_import_games_csv(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_genre_payload = {"title": "genre", "user_id": 1}
+    test_file = (
+        "title,developer,publisher,date_release,image,genres\n"
+        "first,developer,publisher,2023-06-27,,1\n"
+        "second,developer,publisher,2023-06-28,image,\n"
+        "third,developer,publisher,not a date,,\n"
+        "first,developer,publisher,2023-06-27,,\n"
+        "fourth,developer,publisher,2023-06-27,,2\n"
+    )
+    test_answer = [
+        {"line": 4, "status": "rejected", "detail": "date_release: invalid date format"},
+        {"line": 5, "status": "rejected", "detail": "Duplicate title in the import"},
+        {"line": 6, "status": "rejected", "detail": "Genres not Found"},
+        {"status": "progress", "processed": 5, "inserted": 2, "rejected": 3},
+        {"status": "done", "processed": 5, "inserted": 2, "rejected": 3}
+    ]
+    test_game_answer = {
+        "id": 1,
+        "title": "first",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": None,
+        "user_id": 1,
+        "genres": [{"id": 1, "title": "genre", "user_id": 1}]
+    }
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_genre_payload))
+    response = await async_client.post("/games/import", headers={"Authorization": f"Bearer {token}"}, files={"file": ("games.csv", test_file)})
+    assert response.status_code == 200
+    assert [json.loads(line) for line in response.text.splitlines()] == test_answer
+    response = await async_client.get("/games/", headers={"Authorization": f"Bearer {token}"})
+    games = response.json()
+    assert [game["title"] for game in games] == ["first", "second"]
+    assert games[0] == test_game_answer
+
+
+async def test_import_games_ndjson_title_exists(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": []
+    }
+    test_file = (
+        '{"title": "game", "developer": "developer", "publisher": "publisher", "date_release": "2023-06-27"}\n'
+        '\n'
+        '{"title": "new game", "developer": "developer", "publisher": "publisher", "date_release": "2023-06-27"}\n'
+        'not json\n'
+    )
+    test_answer = [
+        {"line": 4, "status": "rejected", "detail": "__root__: Expecting value: line 1 column 1 (char 0)"},
+        {"line": 1, "status": "rejected", "detail": "There is already a Game with this title"},
+        {"status": "progress", "processed": 3, "inserted": 1, "rejected": 2},
+        {"status": "done", "processed": 3, "inserted": 1, "rejected": 2}
+    ]
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.post("/games/import", headers={"Authorization": f"Bearer {token}"}, files={"file": ("games.ndjson", test_file)})
+    assert response.status_code == 200
+    assert [json.loads(line) for line in response.text.splitlines()] == test_answer
+    response = await async_client.get("/games/", headers={"Authorization": f"Bearer {token}"})
+    assert [game["title"] for game in response.json()] == ["game", "new game"]
+
+
 async def test_add_genre_to_game(async_client):
     test_login_payload = {"username": "test_user", "password": "qwerty"}
     test_game_payload = {
@@ -355,6 +703,90 @@ async def test_double_add_genre_to_game(async_client):
     assert response.json() == test_answer
 
 
+async def test_replace_genres_of_game(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": [{"id": 1, "title": "genre_1", "user_id": 1}, {"id": 2, "title": "genre_2", "user_id": 1}]
+    }
+    test_answer = {"game_id": 1, "added": [3], "removed": [1]}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    for number in range(1, 4):
+        test_genre_payload = {"title": f"genre_{number}", "user_id": 1}
+        response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_genre_payload))
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.put("/games/1/genres", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([2, 3, 3]))
+    assert response.status_code == 200
+    assert response.json() == test_answer
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}"})
+    assert sorted(genre["id"] for genre in response.json()["genres"]) == [2, 3]
+    response = await async_client.put("/games/1/genres", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([]))
+    assert response.json() == {"game_id": 1, "added": [], "removed": [2, 3]}
+
+
+async def test_replace_genres_of_game_404_genre(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": []
+    }
+    test_answer = {"detail": "Genres not Found: 5"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.put("/games/1/genres", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([5]))
+    assert response.status_code == 404
+    assert response.json() == test_answer
+    response = await async_client.put("/games/2/genres", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([]))
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Game not Found"}
+
+
+async def test_replace_genres_of_game_wrong_user(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_login_payload_second_user = {"username": "another_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": []
+    }
+    test_answer = {"detail": "The game does not belong to this user"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload_second_user))
+    response = await async_client.post("/users/token", data=test_login_payload_second_user)
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.put("/games/1/genres", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([]))
+    assert response.status_code == 400
+    assert response.json() == test_answer
+
+
 async def test_remove_genre_from_game(async_client):
     test_login_payload = {"username": "test_user", "password": "qwerty"}
     test_game_payload = {
@@ -519,6 +951,49 @@ async def test_update_game(async_client):
     assert response.json() == test_answer
 
 
+async def test_update_game_with_genres(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_genre_payload = {"title": "genre", "user_id": 1}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": [{"id": 1, "title": "genre", "user_id": 1}]
+    }
+    test_new_game_data_payload = {
+        "title": "new_game",
+        "developer": "new_developer",
+        "publisher": "new_publisher",
+        "date_release": "2023-06-28"
+    }
+    test_answer = {
+        "id": 1,
+        "title": "new_game",
+        "developer": "new_developer",
+        "publisher": "new_publisher",
+        "date_release": "2023-06-28",
+        "image": "string",
+        "user_id": 1,
+        "genres": [{"id": 1, "title": "genre", "user_id": 1}]
+    }
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_genre_payload))
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.put("/games/1", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_new_game_data_payload))
+    assert response.status_code == 200
+    assert response.json() == test_answer
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}"})
+    assert response.json() == test_answer
+
+
 async def test_update_game_incorrect(async_client):
     test_new_game_data_payload = {
         "title": "new_game",
@@ -688,4 +1163,205 @@ async def test_delete_game_404(async_client):
     response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
     response = await async_client.delete("/games/2", headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 404
-    assert response.json() == test_answer
\ No newline at end of file
+    assert response.json() == test_answer
+
+async def test_game_facets(async_client, get_session):
+    from api.crud import rebuild_facets
+
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_genre_payload = {"title": "genre", "user_id": 1}
+    test_other_genre_payload = {"title": "other genre", "user_id": 1}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": [{"id": 1, "title": "genre", "user_id": 1}]
+    }
+    test_new_game_data_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "new publisher",
+        "date_release": "2022-01-01"
+    }
+    test_file = (
+        '{"title": "second", "developer": "developer", "publisher": "publisher", "date_release": "2023-06-27", "genres": [1, 2]}\n'
+        '{"title": "third", "developer": "developer", "publisher": "publisher", "date_release": "2021-06-27"}\n'
+    )
+    test_answer = {
+        "genres": [{"id": 1, "title": "genre", "count": 1}],
+        "years": [{"year": 2021, "count": 1}, {"year": 2022, "count": 1}],
+        "publishers": [{"publisher": "new publisher", "count": 1}, {"publisher": "publisher", "count": 1}]
+    }
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_genre_payload))
+    response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_other_genre_payload))
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.post("/games/import", headers={"Authorization": f"Bearer {token}"}, files={"file": ("games.ndjson", test_file)})
+    response = await async_client.get("/games/facets", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["genres"] == [{"id": 1, "title": "genre", "count": 2}, {"id": 2, "title": "other genre", "count": 1}]
+    assert response.json()["years"] == [{"year": 2023, "count": 2}, {"year": 2021, "count": 1}]
+    assert response.json()["publishers"] == [{"publisher": "publisher", "count": 3}]
+
+    response = await async_client.put("/games/1", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_new_game_data_payload))
+    response = await async_client.patch("/games/1?genre_id=2", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.put("/games/2/genres", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([]))
+    response = await async_client.delete("/games/3", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.put("/games/3/genres", headers={"Authorization": f"Bearer {token}"}, content=json.dumps([]))
+    response = await async_client.post("/games/import", headers={"Authorization": f"Bearer {token}"}, files={"file": ("games.ndjson", test_file.splitlines()[1])})
+    response = await async_client.delete("/games/2", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.patch("/games/1/2", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.get("/games/facets", headers={"Authorization": f"Bearer {token}"})
+    assert response.json() == test_answer
+
+    assert await rebuild_facets(db=get_session) == 5
+    response = await async_client.get("/games/facets", headers={"Authorization": f"Bearer {token}"})
+    assert response.json() == test_answer
+
+
+async def test_game_facets_genre_deleted(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_genre_payload = {"title": "genre", "user_id": 1}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": [{"id": 1, "title": "genre", "user_id": 1}]
+    }
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_genre_payload))
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.delete("/genres/1", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.get("/games/facets", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["genres"] == []
+    assert response.json()["years"] == [{"year": 2023, "count": 1}]
+
+
+async def test_game_facets_concurrent_updates():
+    import asyncio
+    from datetime import date
+    from sqlalchemy import insert
+    from api.crud import get_facets, rebuild_facets, update_game
+    from api.models import Base, Game, User
+    from api.schemas import GameUpdate
+    from tests.conftest import engine, test_async_session
+
+    # Two sessions on their own connections, so the tables have to be committed.
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User.__table__).values(username="test_user", hashed_password="qwerty"))
+        await conn.execute(insert(Game.__table__).values(title="game", developer="developer", publisher="P0", date_release=date(2023, 6, 27), user_id=1))
+    try:
+        async with test_async_session() as first, test_async_session() as second:
+            await rebuild_facets(db=first)
+            first_updated = asyncio.Event()
+            first_may_commit = asyncio.Event()
+            commit = first.commit
+
+            async def held_commit():
+                first_updated.set()
+                await first_may_commit.wait()
+                await commit()
+
+            first.commit = held_commit
+            first_update = asyncio.create_task(update_game(db=first, game_id=1, user_id=1, new_game=GameUpdate(
+                title="game", developer="developer", publisher="PA", date_release=date(2023, 6, 27)
+            )))
+            await first_updated.wait()
+            second_update = asyncio.create_task(update_game(db=second, game_id=1, user_id=1, new_game=GameUpdate(
+                title="game", developer="developer", publisher="PB", date_release=date(2023, 6, 27)
+            )))
+            await asyncio.sleep(0.2)
+            first_may_commit.set()
+            await asyncio.gather(first_update, second_update)
+
+            facets = await get_facets(db=first)
+            assert facets["publishers"] == [{"publisher": "PB", "count": 1}]
+            await rebuild_facets(db=first)
+            assert await get_facets(db=first) == facets
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+
+
+async def test_autocomplete_games(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_new_game_data_payload = {
+        "title": "The Witcher 3",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27"
+    }
+    test_file = (
+        '{"title": "The  Witcher", "developer": "developer", "publisher": "publisher", "date_release": "2023-06-27"}\n'
+        '{"title": "the witcher 2", "developer": "developer", "publisher": "publisher", "date_release": "2023-06-27"}\n'
+        '{"title": "Thief", "developer": "developer", "publisher": "publisher", "date_release": "2023-06-27"}\n'
+        '{"title": "Doom", "developer": "developer", "publisher": "publisher", "date_release": "2023-06-27"}\n'
+    )
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/games/import", headers={"Authorization": f"Bearer {token}"}, files={"file": ("games.ndjson", test_file)})
+    response = await async_client.get("/games/autocomplete?prefix=THE%20WIT", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json() == [{"id": 1, "title": "The  Witcher"}, {"id": 2, "title": "the witcher 2"}]
+    response = await async_client.get("/games/autocomplete?prefix=th&limit=1", headers={"Authorization": f"Bearer {token}"})
+    assert response.json() == [{"id": 1, "title": "The  Witcher"}]
+
+    response = await async_client.put("/games/3", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_new_game_data_payload))
+    response = await async_client.delete("/games/1", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.get("/games/autocomplete?prefix=the", headers={"Authorization": f"Bearer {token}"})
+    assert response.json() == [{"id": 2, "title": "the witcher 2"}, {"id": 3, "title": "The Witcher 3"}]
+    response = await async_client.get("/games/autocomplete?prefix=thi", headers={"Authorization": f"Bearer {token}"})
+    assert response.json() == []
+
+
+async def test_title_index_refresh_keeps_writes_made_while_loading():
+    from api.autocomplete import TitleIndex
+
+    index = TitleIndex(refresh_interval=300)
+    index.add(1, "Doom")
+    index.add(2, "Thief")
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        # A nested refresh is skipped while the first one is loading.
+        await index.refresh(fetch)
+        index.add(3, "The Witcher")
+        index.remove(2)
+        return [(1, "Doom"), (2, "Thief")]
+
+    await index.refresh(fetch)
+    assert len(fetches) == 1
+    assert index.complete("th", 10) == [{"id": 3, "title": "The Witcher"}]
+    assert index.complete("doom", 10) == [{"id": 1, "title": "Doom"}]
+
+
+async def test_autocomplete_games_incorrect(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.get("/games/autocomplete?prefix=", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 422
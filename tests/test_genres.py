@@ -94,6 +94,46 @@ async def test_get_genres(async_client):
     assert response.json() == test_answer
 
 
+async def test_get_genres_cursor(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_answer = [{"id": 3, "user_id": 1, "title": "genre_3"}]
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    for number in range(1, 4):
+        test_genre_payload = {"user_id": 1, "title": f"genre_{number}"}
+        response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_genre_payload))
+    response = await async_client.get("/genres/?limit=2", headers={"Authorization": f"Bearer {token}"})
+    assert [genre["id"] for genre in response.json()] == [1, 2]
+    cursor = response.headers["X-Next-Cursor"]
+    response = await async_client.get(f"/genres/?limit=2&cursor={cursor}", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json() == test_answer
+    assert "X-Next-Cursor" not in response.headers
+
+
+async def test_get_genres_malformed_cursor(async_client):
+    from api.pagination import encode_cursor
+
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_answer = {"detail": "Invalid cursor"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    for cursor in [encode_cursor(["x"]), encode_cursor([1, 2])]:
+        response = await async_client.get(f"/genres/?cursor={cursor}", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 400
+        assert response.json() == test_answer
+    cursor = encode_cursor(["not a date", 1])
+    response = await async_client.get(f"/games/?sort=date_release&cursor={cursor}", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400
+    assert response.json() == test_answer
+
+
 async def test_get_genres_incorrect(async_client):
     test_answer = {"detail": "Could not validate credentials"}
     token = "qwerty"
@@ -163,6 +203,24 @@ async def test_update_genre_400(async_client):
     assert response.json() == test_answer
 
 
+async def test_update_genre_title_is_exists(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_genre_payload = {"user_id": 1, "title": "test_genre"}
+    test_second_genre_payload = {"user_id": 1, "title": "new_title"}
+    test_new_title_genre = {"title": "new_title", "user_id": 1}
+    test_answer = {"detail": "There is already a Genre with this title"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_genre_payload))
+    response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_second_genre_payload))
+    response = await async_client.put("/genres/1", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_new_title_genre))
+    assert response.status_code == 400
+    assert response.json() == test_answer
+
+
 async def test_delete_genre(async_client):
     test_login_payload = {"username": "test_user", "password": "qwerty"}
     test_genre_payload = {"user_id": 1, "title": "test_genre"}
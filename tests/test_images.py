@@ -0,0 +1,91 @@
+import json
+import pytest
+
+
+pytestmark = pytest.mark.asyncio
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+
+
+async def upload_image(async_client, content):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": None,
+        "user_id": 1,
+        "genres": []
+    }
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.put("/games/1/image", headers={"Authorization": f"Bearer {token}"}, content=content)
+    return token, response
+
+
+async def test_upload_image(async_client):
+    token, response = await upload_image(async_client, PNG)
+    assert response.status_code == 200
+    digest = response.json()["image"]
+    assert len(digest) == 64
+    response = await async_client.get(f"/images/{digest}")
+    assert response.status_code == 200
+    assert response.content == PNG
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["etag"] == f'"{digest}"'
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    response = await async_client.get(f"/images/{digest}", headers={"If-None-Match": f'"{digest}"'})
+    assert response.status_code == 304
+
+
+async def test_upload_same_image_twice(async_client):
+    token, response = await upload_image(async_client, PNG)
+    digest = response.json()["image"]
+    response = await async_client.put("/games/1/image", headers={"Authorization": f"Bearer {token}"}, content=PNG)
+    assert response.json()["image"] == digest
+
+
+async def test_upload_image_unsupported(async_client):
+    test_answer = {"detail": "Unsupported image type"}
+    token, response = await upload_image(async_client, b"not an image")
+    assert response.status_code == 415
+    assert response.json() == test_answer
+
+
+async def test_upload_image_wrong_user(async_client):
+    test_login_payload = {"username": "another_user", "password": "qwerty"}
+    test_answer = {"detail": "The game does not belong to this user"}
+    token, response = await upload_image(async_client, PNG)
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+    token = response.json()["access_token"]
+    response = await async_client.put("/games/1/image", headers={"Authorization": f"Bearer {token}"}, content=PNG)
+    assert response.status_code == 400
+    assert response.json() == test_answer
+
+
+async def test_read_image_range(async_client):
+    token, response = await upload_image(async_client, PNG)
+    digest = response.json()["image"]
+    response = await async_client.get(f"/images/{digest}", headers={"Range": "bytes=8-15"})
+    assert response.status_code == 206
+    assert response.content == PNG[8:16]
+    assert response.headers["content-range"] == f"bytes 8-15/{len(PNG)}"
+    response = await async_client.get(f"/images/{digest}", headers={"Range": "bytes=-4"})
+    assert response.content == PNG[-4:]
+    response = await async_client.get(f"/images/{digest}", headers={"Range": f"bytes={len(PNG)}-"})
+    assert response.status_code == 416
+
+
+async def test_read_image_404(async_client):
+    test_answer = {"detail": "Image not Found"}
+    response = await async_client.get("/images/" + "0" * 64)
+    assert response.status_code == 404
+    assert response.json() == test_answer
+    response = await async_client.get("/images/..")
+    assert response.status_code == 404
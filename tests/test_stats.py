@@ -0,0 +1,144 @@
+import json
+import pytest
+
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_principal_cache_stats(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.get("/genres/", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.get("/stats/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["principal_cache"]["misses"] == 1
+    assert response.json()["principal_cache"]["hits"] == 1
+    assert response.json()["principal_cache"]["size"] == 1
+
+
+async def test_password_hasher_stats(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.get("/stats/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["password_hasher"]["in_flight"] == 0
+    assert response.json()["password_hasher"]["queued"] == 0
+    assert response.json()["password_hasher"]["completed"] >= 2
+
+
+async def test_password_hasher_recovers_broken_pool(async_client):
+    import os
+    from concurrent.futures.process import BrokenProcessPool
+    from api.hashing import password_hasher
+
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    with pytest.raises(BrokenProcessPool):
+        password_hasher._get_executor().submit(os._exit, 1).result()
+
+    response = await async_client.post("/users/token", data=test_login_payload)
+    assert response.status_code == 200
+
+
+async def test_principal_cache_invalidated_on_delete(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_answer = {"detail": "Could not validate credentials"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.delete("/users/me", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.get("/genres/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert response.json() == test_answer
+
+
+async def test_game_cache_stats(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_genre_payload = {"title": "genre", "user_id": 1}
+    test_new_title_genre = {"title": "new_genre", "user_id": 1}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": [{"id": 1, "title": "genre", "user_id": 1}]
+    }
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_genre_payload))
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}"})
+    assert response.json()["genres"] == [{"id": 1, "title": "genre", "user_id": 1}]
+    response = await async_client.get("/stats/", headers={"Authorization": f"Bearer {token}"})
+    assert response.json()["game_cache"]["misses"] == 1
+    assert response.json()["game_cache"]["hits"] == 1
+    assert response.json()["game_cache"]["size"] == 1
+    assert response.json()["game_cache"]["bytes"] > 0
+
+    response = await async_client.put("/genres/1", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_new_title_genre))
+    response = await async_client.get("/stats/", headers={"Authorization": f"Bearer {token}"})
+    assert response.json()["game_cache"]["size"] == 0
+    assert response.json()["game_cache"]["bytes"] == 0
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["genres"] == [{"id": 1, "title": "new_genre", "user_id": 1}]
+
+
+async def test_game_cache_invalidated_on_genre_delete(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_genre_payload = {"title": "genre", "user_id": 1}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": [{"id": 1, "title": "genre", "user_id": 1}]
+    }
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_genre_payload))
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.get("/genres/1", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.get("/stats/", headers={"Authorization": f"Bearer {token}"})
+    assert response.json()["game_cache"]["size"] == 1
+    assert response.json()["genre_cache"]["size"] == 1
+
+    response = await async_client.delete("/genres/1", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.get("/stats/", headers={"Authorization": f"Bearer {token}"})
+    assert response.json()["game_cache"]["size"] == 0
+    assert response.json()["genre_cache"]["size"] == 0
+    response = await async_client.get("/games/1", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["genres"] == []
+    response = await async_client.get("/genres/1", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 404
+
+
+async def test_stats_incorrect(async_client):
+    test_answer = {"detail": "Could not validate credentials"}
+    token = "qwerty"
+    response = await async_client.get("/stats/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert response.json() == test_answer
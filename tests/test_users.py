@@ -19,6 +19,40 @@ async def test_create_user_incorrect(async_client):
     assert response.status_code == 422
 
 
+async def test_bulk_register(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_bulk_payload = "\n".join([
+        json.dumps({"username": "first_user", "password": "qwerty"}),
+        json.dumps({"username": "test_user", "password": "qwerty"}),
+        "not json",
+        json.dumps({"username": "first_user", "password": "qwerty"}),
+        json.dumps({"username": "second_user", "password": "qwerty"}),
+    ])
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/users/bulk_register", headers={"Authorization": f"Bearer {token}"}, content=test_bulk_payload)
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["line"] for result in results] == [1, 2, 3, 4, 5]
+    assert [result["status"] for result in results] == ["created", "conflict", "invalid", "conflict", "created"]
+    assert results[0]["id"] == 2
+    assert results[4]["id"] == 3
+
+    response = await async_client.post("/users/token", data={"username": "second_user", "password": "qwerty"})
+    assert response.status_code == 200
+
+
+async def test_bulk_register_incorrect(async_client):
+    test_answer = {"detail": "Could not validate credentials"}
+    token = "qwerty"
+    response = await async_client.post("/users/bulk_register", headers={"Authorization": f"Bearer {token}"}, content="")
+    assert response.status_code == 401
+    assert response.json() == test_answer
+
+
 async def test_login(async_client):
     test_login_payload = {"username": "test_user", "password": "qwerty"}
     response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
@@ -36,6 +70,20 @@ async def test_login_incorrect(async_client):
     assert response.json() == test_answer
 
 
+async def test_login_throttled(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    incorrect_data = {"username": "test_user", "password": "qwe"}
+    test_answer = {"detail": "Too many login attempts"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    for _ in range(5):
+        response = await async_client.post("/users/token", data=incorrect_data)
+        assert response.status_code == 401
+    response = await async_client.post("/users/token", data=test_login_payload)
+    assert response.status_code == 429
+    assert response.json() == test_answer
+    assert "retry-after" in response.headers
+
+
 async def test_users_me(async_client):
     test_login_payload = {"username": "test_user", "password": "qwerty"}
     test_response_payload = {"id": 1, "username": "test_user", "backlog": None, "complete_game": None, "games": [], "genres": []}
@@ -49,6 +97,75 @@ async def test_users_me(async_client):
     assert response.json() == test_response_payload
 
 
+async def test_users_me_with_backlog(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_response_payload = {"id": 1, "username": "test_user", "backlog": {"id": 1, "user_id": 1}, "complete_game": None, "games": [], "genres": []}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/backlogs/", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json() == test_response_payload
+
+
+async def test_users_me_not_modified(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_genre_payload = {"title": "genre", "user_id": 1}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+    etag = response.headers["etag"]
+    response = await async_client.get("/users/me", headers={"Authorization": f"Bearer {token}", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+    response = await async_client.post("/genres/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_genre_payload))
+    response = await async_client.get("/users/me", headers={"Authorization": f"Bearer {token}", "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["genres"] == [{"id": 1, "title": "genre", "user_id": 1}]
+
+
+async def test_users_me_modified_by_game_update(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "string",
+        "developer": "string",
+        "publisher": "string",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": []
+    }
+    test_update_payload = {
+        "title": "new_title",
+        "developer": "string",
+        "publisher": "string",
+        "date_release": "2023-06-27"
+    }
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+    etag = response.headers["etag"]
+
+    response = await async_client.put("/games/1", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_update_payload))
+    assert response.status_code == 200
+    response = await async_client.get("/users/me", headers={"Authorization": f"Bearer {token}", "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["games"][0]["title"] == "new_title"
+
+
 async def test_users_me_incorrect(async_client):
     test_answer = {"detail": "Could not validate credentials"}
     token = "qwerty"
@@ -59,7 +176,16 @@ async def test_users_me_incorrect(async_client):
 
 async def test_read_users(async_client):
     test_login_payload = {"username": "test_user", "password": "qwerty"}
-    test_response_payload = [{"id": 1, "username": "test_user", "backlog": None, "complete_game": None, "games": [], "genres": []}]
+    test_response_payload = [{
+        "id": 1,
+        "username": "test_user",
+        "backlog_id": None,
+        "complete_game_id": None,
+        "games_count": 0,
+        "genres_count": 0,
+        "backlog_games_count": 0,
+        "complete_games_count": 0
+    }]
     response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
     response = await async_client.post("/users/token", data=test_login_payload)
 
@@ -70,6 +196,65 @@ async def test_read_users(async_client):
     assert response.json() == test_response_payload
 
 
+async def test_read_users_cursor(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    second_user = {"username": "another_user", "password": "qwerty"}
+    test_game_payload = {
+        "title": "game",
+        "developer": "developer",
+        "publisher": "publisher",
+        "date_release": "2023-06-27",
+        "image": "string",
+        "user_id": 1,
+        "genres": []
+    }
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/register", content=json.dumps(second_user))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.post("/backlogs/", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.post("/games/", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(test_game_payload))
+    response = await async_client.put("/backlogs/?game_id=1", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.get("/users/?limit=1", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert [user["username"] for user in response.json()] == ["test_user"]
+    assert response.json()[0]["backlog_id"] == 1
+    assert response.json()[0]["games_count"] == 1
+    assert response.json()[0]["backlog_games_count"] == 1
+
+    cursor = response.headers["X-Next-Cursor"]
+    response = await async_client.get(f"/users/?cursor={cursor}&limit=1", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert [user["username"] for user in response.json()] == ["another_user"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+async def test_read_users_invalid_cursor(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_answer = {"detail": "Invalid cursor"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.get("/users/?cursor=qwerty", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400
+    assert response.json() == test_answer
+
+
+async def test_read_users_limit_too_large(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.get("/users/?limit=1000", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 422
+
+
 async def test_read_users_incorrect(async_client):
     test_answer = {"detail": "Could not validate credentials"}
     token = "qwerty"
@@ -124,6 +309,21 @@ async def test_update_user(async_client):
     assert response.json() == test_response_payload
 
 
+async def test_update_user_keeps_token(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_response_payload = {"id": 1, "username": "new_name_user", "backlog": None, "complete_game": None, "games": [], "genres": []}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    new_username = {"username": "new_name_user"}
+    response = await async_client.put("/users/me", headers={"Authorization": f"Bearer {token}"}, content=json.dumps(new_username))
+    response = await async_client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json() == test_response_payload
+
+
 async def test_update_user_incorrect(async_client):
     test_answer = {"detail": "Could not validate credentials"}
     token = "qwerty"
@@ -166,3 +366,34 @@ async def test_delete_user_incorrect(async_client):
     response = await async_client.delete("/users/me", headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 401
     assert response.json() == test_answer
+
+
+async def test_logout(async_client):
+    test_login_payload = {"username": "test_user", "password": "qwerty"}
+    test_answer = {"message": "All tokens have been revoked"}
+    response = await async_client.post("/users/register", content=json.dumps(test_login_payload))
+    response = await async_client.post("/users/token", data=test_login_payload)
+
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+    response = await async_client.post("/users/logout", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json() == test_answer
+
+    response = await async_client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+
+    response = await async_client.post("/users/token", data=test_login_payload)
+    token = response.json()
+    token = token["access_token"]
+    response = await async_client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+
+async def test_logout_incorrect(async_client):
+    test_answer = {"detail": "Could not validate credentials"}
+    token = "qwerty"
+    response = await async_client.post("/users/logout", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert response.json() == test_answer